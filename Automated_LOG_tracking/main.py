@@ -6,6 +6,7 @@ from tkinter import Canvas
 from fpdf import FPDF
 import threading
 import numpy as np
+from smart_yard_common.motion_gate import MotionGate
 
 # Initialize the YOLO model
 net = cv2.dnn.readNet('yolov3.weights', 'yolov3.cfg')
@@ -31,6 +32,7 @@ classes = [
 log_data_list = []
 cap = None
 running = True  # Global variable to control the video feed
+last_detected_objects = None  # Detections of the last frame the detector ran on, reused while the scene is static
 
 def log_data(truck_id, position, object_size, label):
     log_entry = f"{datetime.datetime.now()}, Truck ID: {truck_id}, Position: {position}, Object Size: {object_size}, Detected Object: {label}\n"
@@ -38,7 +40,7 @@ def log_data(truck_id, position, object_size, label):
     with open('log_file.txt', 'a') as log_file:
         log_file.write(log_entry)
 
-def detect_objects(frame):
+def run_detector(frame):
     height, width, _ = frame.shape
     blob = cv2.dnn.blobFromImage(frame, 0.00392, (416, 416), (0, 0, 0), True, crop=False)
     net.setInput(blob)
@@ -75,24 +77,48 @@ def detect_objects(frame):
         for i in indexes.flatten():
             x, y, w, h = boxes[i]
             label = classes[class_ids[i]] if class_ids[i] < len(classes) else "Unknown"
+            detected_objects.append((label, (x, y, w, h), confidences[i]))
+
+    return detected_objects
+
+def draw_objects(frame, detected_objects):
+    for label, (x, y, w, h), confidence in detected_objects:
+        # Assign colors based on the label
+        color = (255, 255, 255)  # Default white for unknown objects
+        if label == "person":
+            color = (0, 0, 255)  # Red for person
+        elif label == "traffic light":
+            color = (0, 165, 255)  # Orange for traffic light
+        elif label == "truck":
+            color = (0, 255, 0)  # Green for truck
+
+        cv2.rectangle(frame, (x, y), (x + w, y + h), color, 2)
+        cv2.putText(frame, f"{label} {int(confidence * 100)}%", (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+    return frame
 
-            # Assign colors based on the label
-            color = (255, 255, 255)  # Default white for unknown objects
-            if label == "person":
-                color = (0, 0, 255)  # Red for person
-            elif label == "traffic light":
-                color = (0, 165, 255)  # Orange for traffic light
-            elif label == "truck":
-                color = (0, 255, 0)  # Green for truck
+def detect_objects(frame, motion_gate=None):
+    """
+    Detect, draw and log the objects of a frame.
 
-            cv2.rectangle(frame, (x, y), (x + w, y + h), color, 2)
-            cv2.putText(frame, f"{label} {int(confidences[i] * 100)}%", (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
-            detected_objects.append((label, (x, y, w, h)))
+    Args:
+        frame (numpy.ndarray): BGR frame, annotated in place.
+        motion_gate (MotionGate, optional): Skips the detector when the scene has not changed since it last ran,
+            and draws its previous detections instead. Those frames are not logged again.
 
-    for obj in detected_objects:
-        log_data(truck_id=1, position=obj[1], object_size="medium", label=obj[0])
+    Returns:
+        numpy.ndarray: The annotated frame.
+    """
+    global last_detected_objects
+    # The gate sees every frame, the first one included, so that it holds the frame the detector last ran on
+    if motion_gate is not None and not motion_gate.should_run(frame) and last_detected_objects is not None:
+        return draw_objects(frame, last_detected_objects)
 
-    return frame
+    detected_objects = run_detector(frame)
+    last_detected_objects = detected_objects
+    for label, position, _ in detected_objects:
+        log_data(truck_id=1, position=position, object_size="medium", label=label)
+
+    return draw_objects(frame, detected_objects)
 
 def capture_image():
     cap = cv2.VideoCapture(0)
@@ -117,6 +143,8 @@ def process_video(video_path=None):
 
     frame_skip = 2  # Process every 2nd frame
     frame_count = 0
+    # Parked trailers do not need the detector, it runs when something moves and at least every 30 processed frames
+    motion_gate = MotionGate(refresh_interval=30)
 
     while running:
         ret, frame = cap.read()
@@ -125,7 +153,7 @@ def process_video(video_path=None):
 
         frame_count += 1
         if frame_count % frame_skip == 0:
-            frame = detect_objects(frame)
+            frame = detect_objects(frame, motion_gate)
             display_frame(frame)  # Use OpenCV to display the frame
 
         if cv2.waitKey(1) & 0xFF == ord('q'):
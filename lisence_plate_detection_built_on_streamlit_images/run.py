@@ -10,8 +10,9 @@ from ultralytics import YOLO
 # Set the environment variable to avoid OpenMP runtime conflict
 os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
 
-from paddleocr import PaddleOCR
-ocr = PaddleOCR(lang='en',rec_algorithm='CRNN')
+from smart_yard_common.plate_ocr import create_recognizer
+# Recognition only: the plates are already cropped by YOLO, and all the plates of an image are read at once
+ocr = create_recognizer("paddleocr", lang='en', rec_algorithm='CRNN')
 
 
 # Load the YOLOv8 model
@@ -62,15 +63,9 @@ def predict_license_plate(image):
 
 def draw_annotations(image, annotations):
     draw = ImageDraw.Draw(image)
+    binary_images = []
     for ann in annotations:
         bbox = ann['bbox']
-        confidence = ann['confidence']
-        
-        # Draw bounding box
-        draw.rectangle([(bbox[0], bbox[1]), (bbox[2], bbox[3])], outline='blue', width=3)
-        # Annotate confidence
-        # draw.text((bbox[0], bbox[1] - 10), f"Confidence: {confidence:.2f}", fill='blue')
-        font=ImageFont.load_default()
 
         cropped_plate = image.crop((bbox[0], bbox[1], bbox[2], bbox[3]))
 
@@ -79,13 +74,23 @@ def draw_annotations(image, annotations):
 
         # Preprocess the image
         enhanced_image = enhance_contrast(cropped_plate_arr)
-        binary_image = adaptive_threshold(enhanced_image)
+        binary_images.append(adaptive_threshold(enhanced_image))
+
+    # results = reader.readtext(binary_image)
+    results = ocr.recognize(binary_images)
 
-        # results = reader.readtext(binary_image)
-        results = ocr.ocr(binary_image, cls=False, det=False)
+    for ann, (text, score) in zip(annotations, results):
+        bbox = ann['bbox']
+        confidence = ann['confidence']
         
-        if results and results[0][0][1]>0.6:
-            label=results[0][0][0]
+        # Draw bounding box
+        draw.rectangle([(bbox[0], bbox[1]), (bbox[2], bbox[3])], outline='blue', width=3)
+        # Annotate confidence
+        # draw.text((bbox[0], bbox[1] - 10), f"Confidence: {confidence:.2f}", fill='blue')
+        font=ImageFont.load_default()
+
+        if text and score>0.6:
+            label=text
 
         else:
             label=f"License_plate {confidence}"
@@ -0,0 +1,65 @@
+import threading
+
+
+def ip_geolocation():
+    """
+    Look up the location of the machine from its public IP address. This is a blocking network request.
+
+    Returns:
+        tuple or None: (latitude, longitude), None if the lookup failed.
+    """
+    import geocoder
+    g = geocoder.ip('me')
+    return tuple(g.latlng) if g and g.latlng else None
+
+
+class CameraLocation:
+
+    def __init__(self, latlng=None, lookup=ip_geolocation, ttl=3600, retry_interval=60):
+        """
+        Initialize the location of a camera, read without any I/O on the frame path.
+
+        A fixed camera is given its latlng, which is returned as is. Otherwise, the location is looked up on a
+        background thread, started by the first call of get and refreshed every ttl seconds, or every
+        retry_interval seconds while the lookup fails. get returns the last location found, and (None, None)
+        until the first lookup succeeds.
+
+        Args:
+            latlng (tuple, optional): Static (latitude, longitude) of the camera.
+            lookup (function, optional): Returns the (latitude, longitude) of the camera, or None on failure.
+                Only used without latlng; None disables the lookup.
+            ttl (float): Seconds between two successful lookups.
+            retry_interval (float): Seconds between two lookups after a failure.
+        """
+        self.latlng = tuple(latlng) if latlng is not None else (None, None)
+        self.lookup = lookup if latlng is None else None
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def _refresh(self):
+        while not self._stopped.is_set():
+            try:
+                latlng = self.lookup()
+            except Exception:
+                latlng = None
+            if latlng is not None:
+                self.latlng = tuple(latlng)
+            self._stopped.wait(self.ttl if latlng is not None else self.retry_interval)
+
+    def get(self):
+        """
+        Returns:
+            tuple: (latitude, longitude) of the camera, (None, None) while it is unknown.
+        """
+        if self.lookup is not None and self._thread is None:
+            self._thread = threading.Thread(target=self._refresh, name="camera-location", daemon=True)
+            self._thread.start()
+        return self.latlng
+
+    def close(self):
+        """
+        Stop the background lookup.
+        """
+        self._stopped.set()
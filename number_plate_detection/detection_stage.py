@@ -0,0 +1,99 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# Ways of running the vehicle and license plate detectors on a frame
+DETECTION_MODES = ("sequential", "parallel", "cascade")
+
+
+class DetectionStage:
+
+    def __init__(self, vehicle_detector, plate_detector, mot_tracker, vehicle_classes, mode="parallel",
+                 crop_margin=0.0, min_crop_size=32):
+        """
+        Initialize the detection stage of the pipeline: vehicle detection, vehicle tracking and plate detection.
+
+        Modes:
+            - "sequential": both detectors run on the whole frame, one after the other.
+            - "parallel": both detectors run on the whole frame at the same time, the plate detector on a worker
+              thread. PyTorch releases the GIL during inference, so the frame takes about the time of the slower
+              detector instead of the sum of both.
+            - "cascade": the plate detector only runs on the crops of the vehicles tracked by SORT, in a single
+              batched call. Its cost follows the number of vehicles instead of the frame area.
+
+        Args:
+            vehicle_detector (TiledDetector): Detector of the vehicles.
+            plate_detector (TiledDetector): Detector of the license plates. Only its model and predict options
+                are used in the "cascade" mode.
+            mot_tracker (Sort): SORT tracker of the vehicles.
+            vehicle_classes (list): Class IDs of the vehicles.
+            mode (str): One of DETECTION_MODES.
+            crop_margin (float): Margin added around the vehicle crops of the "cascade" mode, as a fraction of
+                the box size.
+            min_crop_size (int): Vehicles narrower or shorter than this, in pixels, are not searched for plates in
+                the "cascade" mode.
+        """
+        if mode not in DETECTION_MODES:
+            raise ValueError(f"mode must be one of {DETECTION_MODES}")
+        self.vehicle_detector = vehicle_detector
+        self.plate_detector = plate_detector
+        self.mot_tracker = mot_tracker
+        self.vehicle_classes = set(vehicle_classes)
+        self.mode = mode
+        self.crop_margin = crop_margin
+        self.min_crop_size = min_crop_size
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="plate-detector") \
+            if mode == "parallel" else None
+
+    def _track_vehicles(self, frame):
+        detections = self.vehicle_detector.detect(frame)
+        detections_ = [detection[:5] for detection in detections.boxes.data.tolist()
+                       if int(detection[5]) in self.vehicle_classes]
+        return self.mot_tracker.update(np.asarray(detections_, dtype=float).reshape(-1, 5))
+
+    def _detect_plates_in_vehicles(self, frame, track_ids):
+        height, width = frame.shape[:2]
+        crops = []
+        for xcar1, ycar1, xcar2, ycar2, _ in track_ids:
+            margin_x, margin_y = (xcar2 - xcar1) * self.crop_margin, (ycar2 - ycar1) * self.crop_margin
+            x1, y1 = max(int(xcar1 - margin_x), 0), max(int(ycar1 - margin_y), 0)
+            x2, y2 = min(int(xcar2 + margin_x), width), min(int(ycar2 + margin_y), height)
+            if x2 - x1 >= self.min_crop_size and y2 - y1 >= self.min_crop_size:
+                crops.append((x1, y1, x2, y2))
+        if not crops:
+            return []
+        results = self.plate_detector.model.predict([frame[y1:y2, x1:x2] for x1, y1, x2, y2 in crops],
+                                                    **self.plate_detector.predict_options)
+        license_plates = []
+        for (x1, y1, _, _), result in zip(crops, results):
+            for px1, py1, px2, py2, score, class_id in result.boxes.data.tolist():
+                license_plates.append([px1 + x1, py1 + y1, px2 + x1, py2 + y1, score, class_id])
+        return license_plates
+
+    def run(self, frame):
+        """
+        Detect and track the vehicles of a frame, and detect its license plates.
+
+        Args:
+            frame (numpy.ndarray): BGR frame.
+
+        Returns:
+            tuple: SORT tracks of the vehicles, as an array of (x1, y1, x2, y2, car_id), and the license plates,
+            as a list of [x1, y1, x2, y2, score, class_id] in frame coordinates.
+        """
+        if self.mode == "cascade":
+            track_ids = self._track_vehicles(frame)
+            return track_ids, self._detect_plates_in_vehicles(frame, track_ids)
+        if self.mode == "parallel":
+            plates_future = self.executor.submit(self.plate_detector.detect, frame)
+            track_ids = self._track_vehicles(frame)
+            return track_ids, plates_future.result().boxes.data.tolist()
+        track_ids = self._track_vehicles(frame)
+        return track_ids, self.plate_detector.detect(frame).boxes.data.tolist()
+
+    def close(self):
+        """
+        Stop the worker thread of the "parallel" mode.
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
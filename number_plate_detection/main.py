@@ -1,22 +1,53 @@
 import streamlit as st
 import cv2
-import numpy as np
 from ultralytics import YOLO
 from datetime import datetime
-import geocoder  # for location (latitude and longitude)
 from sort.Sort import *  # Assuming you have the SORT implementation
-from util import get_car, read_license_plate, write_csv  # Custom utility functions
+from util import assign_cars, read_license_plates, write_csv  # Custom utility functions
+from smart_yard_common.motion_gate import MotionGate
+from smart_yard_common.tiling import TiledDetector
+from detection_stage import DetectionStage
+from plate_voting import PlateVoter
+from camera_location import CameraLocation
 
 # Initialize YOLO models
 coco_model = YOLO('yolov8n.pt')  # Model for detecting trucks/vehicles
 license_plate_detector = YOLO('license_plate_detector.pt')  # Model for detecting license plates
 
-# Initialize SORT tracker
-mot_tracker = Sort()
+# Regions of the frame the detectors run on, as (x1, y1, x2, y2) in pixels, e.g. the lanes of the gate.
+# None runs them on the whole frame.
+ROIS = None
+# Size of the tiles the regions are cut in for the plate detector, e.g. 640 on 4K cameras, None to keep them whole
+PLATE_TILE_SIZE = None
 
 # Define vehicle classes (e.g., car, truck, etc.)
 vehicles = [2, 3, 5, 7]
 
+vehicle_detector = TiledDetector(coco_model, rois=ROIS, classes=vehicles)
+# Plates are small: tiles keep them at the native resolution, and each whole region is also given for close-ups
+plate_detector = TiledDetector(license_plate_detector, rois=ROIS, tile_size=PLATE_TILE_SIZE, include_full_region=True)
+
+# Initialize SORT tracker
+mot_tracker = Sort()
+
+# "parallel" runs the vehicle and plate detectors at the same time, "cascade" runs the plate detector
+# only on the tracked vehicles, "sequential" runs them one after the other
+DETECTION_MODE = "parallel"
+detection_stage = DetectionStage(vehicle_detector, plate_detector, mot_tracker, vehicles, mode=DETECTION_MODE)
+
+# Vote on the plate of each car across frames, and stop reading it once the readings agree
+plate_voter = PlateVoter(consensus_threshold=0.8, min_reads=3, recheck_interval=30)
+
+# Skip both detectors while nothing moves in the yard, refreshing at least once per second of 30 fps video
+motion_gate = MotionGate(refresh_interval=30)
+
+# Video source of the camera
+VIDEO_SOURCE = './sample.mp4'
+# Fixed location of each camera, as (latitude, longitude). The cameras missing here fall back to an IP
+# geolocation looked up in the background and refreshed every hour.
+CAMERA_LOCATIONS = {}
+camera_location = CameraLocation(latlng=CAMERA_LOCATIONS.get(VIDEO_SOURCE), ttl=3600)
+
 # Initialize variables for tracking
 results = {}
 prev_position = None
@@ -39,14 +70,14 @@ def get_time_date():
     return now.strftime("%Y-%m-%d %H:%M:%S")
 
 def get_location():
-    g = geocoder.ip('me')
-    return g.latlng if g else (None, None)
+    # Cached location of the camera, no network request on the frame path
+    return camera_location.get()
 
 def main():
     st.title("Enhanced Truck Tracking System")
 
     # Load video
-    cap = cv2.VideoCapture('./sample.mp4')
+    cap = cv2.VideoCapture(VIDEO_SOURCE)
 
     frame_nmr = -1
     ret = True
@@ -60,65 +91,78 @@ def main():
 
         results[frame_nmr] = {}
 
-        # Detect vehicles
-        detections = coco_model(frame)[0]
-        detections_ = []
-        for detection in detections.boxes.data.tolist():
-            x1, y1, x2, y2, score, class_id = detection
-            if int(class_id) in vehicles:
-                detections_.append([x1, y1, x2, y2, score])
-
-        # Track vehicles
-        track_ids = mot_tracker.update(np.asarray(detections_))
-
-        # Detect license plates
-        license_plates = license_plate_detector(frame)[0]
-        for license_plate in license_plates.boxes.data.tolist():
-            x1, y1, x2, y2, score, class_id = license_plate
+        # Static scene: reuse the vehicles, tracks and plates of the previous frame
+        if not motion_gate.should_run(frame):
+            results[frame_nmr] = dict(results[frame_nmr - 1])
+            st.image(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), channels="RGB")
+            continue
 
-            # Assign license plate to car
-            xcar1, ycar1, xcar2, ycar2, car_id = get_car(license_plate, track_ids)
+        # Detect and track vehicles, and detect license plates
+        track_ids, license_plates = detection_stage.run(frame)
 
+        # Assign license plates to cars, all at once
+        assigned_plates = []
+        for license_plate, (xcar1, ycar1, xcar2, ycar2, car_id) in zip(license_plates,
+                                                                      assign_cars(license_plates, track_ids)):
             if car_id != -1:
+                assigned_plates.append((license_plate, (xcar1, ycar1, xcar2, ycar2), car_id))
+
+        # Only read the plates until the readings of their car agree, then occasionally to check them
+        plates_to_read, license_plate_crops = [], []
+        for license_plate, _, car_id in assigned_plates:
+            if plate_voter.needs_read(car_id, frame_nmr):
                 # Crop and process license plate
+                x1, y1, x2, y2, score, class_id = license_plate
                 license_plate_crop = frame[int(y1):int(y2), int(x1): int(x2), :]
                 license_plate_crop_gray = cv2.cvtColor(license_plate_crop, cv2.COLOR_BGR2GRAY)
                 _, license_plate_crop_thresh = cv2.threshold(license_plate_crop_gray, 64, 255, cv2.THRESH_BINARY_INV)
+                plates_to_read.append(car_id)
+                license_plate_crops.append(license_plate_crop_thresh)
 
-                # Read license plate number
-                license_plate_text, license_plate_text_score = read_license_plate(license_plate_crop_thresh)
-
-                if license_plate_text is not None:
-                    position = ((xcar1 + xcar2) // 2, (ycar1 + ycar2) // 2)
-                    movement_status = detect_movement(position)
-                    time_date = get_time_date()
-                    location = get_location()
-
-                    results[frame_nmr][car_id] = {
-                        'car': {'bbox': [xcar1, ycar1, xcar2, ycar2]},
-                        'license_plate': {
-                            'bbox': [x1, y1, x2, y2],
-                            'text': license_plate_text,
-                            'bbox_score': score,
-                            'text_score': license_plate_text_score
-                        },
-                        'movement_status': movement_status,
-                        'time_date': time_date,
-                        'location': location
-                    }
-
-                    st.write(f"Frame {frame_nmr}:")
-                    st.write(f"Detected Number Plate: {license_plate_text}")
-                    st.write(f"Truck Position: {position}")
-                    st.write(f"Movement Status: {movement_status}")
-                    st.write(f"Time and Date: {time_date}")
-                    st.write(f"Location (Lat, Long): {location}")
+        # Read the license plate numbers of the frame in a single OCR call
+        if license_plate_crops:
+            for car_id, (text, text_score) in zip(plates_to_read, read_license_plates(license_plate_crops)):
+                plate_voter.add(car_id, text, text_score, frame_nmr)
+
+        for license_plate, (xcar1, ycar1, xcar2, ycar2), car_id in assigned_plates:
+            x1, y1, x2, y2, score, class_id = license_plate
+            license_plate_text, license_plate_text_score, _ = plate_voter.result(car_id)
+
+            if license_plate_text is not None:
+                position = ((xcar1 + xcar2) // 2, (ycar1 + ycar2) // 2)
+                movement_status = detect_movement(position)
+                time_date = get_time_date()
+                location = get_location()
+
+                results[frame_nmr][car_id] = {
+                    'car': {'bbox': [xcar1, ycar1, xcar2, ycar2]},
+                    'license_plate': {
+                        'bbox': [x1, y1, x2, y2],
+                        'text': license_plate_text,
+                        'bbox_score': score,
+                        'text_score': license_plate_text_score
+                    },
+                    'movement_status': movement_status,
+                    'time_date': time_date,
+                    'location': location
+                }
+
+                st.write(f"Frame {frame_nmr}:")
+                st.write(f"Detected Number Plate: {license_plate_text}")
+                st.write(f"Truck Position: {position}")
+                st.write(f"Movement Status: {movement_status}")
+                st.write(f"Time and Date: {time_date}")
+                st.write(f"Location (Lat, Long): {location}")
+
+        plate_voter.prune(frame_nmr)
 
         # Convert frame for display
         frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         st.image(frame, channels="RGB")
 
     cap.release()
+    detection_stage.close()
+    camera_location.close()
 
     # Write results to CSV
     write_csv(results, './test.csv')
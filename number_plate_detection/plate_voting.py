@@ -0,0 +1,123 @@
+from collections import defaultdict
+
+
+class PlateVoter:
+
+    def __init__(self, consensus_threshold=0.8, min_reads=3, recheck_interval=30, max_age=300):
+        """
+        Initialize the accumulator of the license plate readings of each tracked car.
+
+        Every reading votes for its character at each position, weighted by its OCR score. A car reaches consensus
+        once it has min_reads readings and the winning character of every position holds at least
+        consensus_threshold of the votes of that position. The plate of a car with consensus is then only read
+        again every recheck_interval frames; a recheck that disagrees lowers the consensus and resumes the readings.
+
+        Args:
+            consensus_threshold (float): Minimum share of the votes of the winning character at every position.
+            min_reads (int): Minimum number of readings before consensus.
+            recheck_interval (int): Number of frames between two readings of a car with consensus.
+            max_age (int): Number of frames after which the readings of a car that is no longer seen are dropped.
+        """
+        self.consensus_threshold = consensus_threshold
+        self.min_reads = min_reads
+        self.recheck_interval = recheck_interval
+        self.max_age = max_age
+        self.tracks = {}  # Car ID -> votes of the car
+
+    def _track(self, car_id):
+        if car_id not in self.tracks:
+            self.tracks[car_id] = {
+                # Text length -> position -> character -> score
+                "votes": defaultdict(lambda: defaultdict(lambda: defaultdict(float))),
+                "reads": defaultdict(int),  # Text length -> number of readings
+                "last_read": None,  # Frame of the last reading
+                "last_seen": None  # Frame the car was last seen in
+            }
+        return self.tracks[car_id]
+
+    def needs_read(self, car_id, frame_nmr):
+        """
+        Decide whether the plate of a car has to be read in a frame.
+
+        Args:
+            car_id (int): ID of the car.
+            frame_nmr (int): Number of the frame.
+
+        Returns:
+            bool: True until the car reaches consensus, then every recheck_interval frames.
+        """
+        track = self._track(car_id)
+        track["last_seen"] = frame_nmr
+        if not self.has_consensus(car_id):
+            return True
+        return frame_nmr - track["last_read"] >= self.recheck_interval
+
+    def add(self, car_id, text, score, frame_nmr):
+        """
+        Add a reading of the plate of a car.
+
+        Args:
+            car_id (int): ID of the car.
+            text (str or None): Text read, None if the reading failed.
+            score (float or None): OCR score of the reading.
+            frame_nmr (int): Number of the frame.
+        """
+        track = self._track(car_id)
+        track["last_read"] = frame_nmr
+        track["last_seen"] = frame_nmr
+        if text is None:
+            return
+        votes = track["votes"][len(text)]
+        for position, character in enumerate(text):
+            votes[position][character] += score
+        track["reads"][len(text)] += 1
+
+    def result(self, car_id):
+        """
+        Get the voted plate of a car.
+
+        Args:
+            car_id (int): ID of the car.
+
+        Returns:
+            tuple: Voted text, with the most read length and the winning character of each position, its mean
+            score per reading, and its consensus, the smallest share of the votes won at a position.
+            (None, None, 0.0) if the plate has not been read.
+        """
+        track = self.tracks.get(car_id)
+        if track is None or not track["reads"]:
+            return None, None, 0.0
+        length = max(track["reads"], key=track["reads"].get)
+        reads = track["reads"][length]
+        text, best_scores, consensus = "", [], 1.0
+        for position in range(length):
+            character_votes = track["votes"][length][position]
+            character = max(character_votes, key=character_votes.get)
+            text += character
+            best_scores.append(character_votes[character])
+            consensus = min(consensus, character_votes[character] / sum(character_votes.values()))
+        return text, sum(best_scores) / (len(best_scores) * reads), consensus
+
+    def has_consensus(self, car_id):
+        """
+        Args:
+            car_id (int): ID of the car.
+
+        Returns:
+            bool: True if the plate of the car has been read consistently enough to stop reading it.
+        """
+        track = self.tracks.get(car_id)
+        if track is None or not track["reads"] or max(track["reads"].values()) < self.min_reads:
+            return False
+        return self.result(car_id)[2] >= self.consensus_threshold
+
+    def prune(self, frame_nmr):
+        """
+        Drop the readings of the cars not seen for max_age frames.
+
+        Args:
+            frame_nmr (int): Number of the current frame.
+        """
+        for car_id in [car_id for car_id, track in self.tracks.items()
+                       if frame_nmr - track["last_seen"] > self.max_age]:
+            del self.tracks[car_id]
@@ -1,8 +1,11 @@
 import string
-import easyocr
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from smart_yard_common.plate_ocr import create_recognizer
 
-# Initialize the OCR reader
-reader = easyocr.Reader(['en'], gpu=False)
+# Initialize the OCR recognizer: plate crops are read without text detection, all the crops of a frame at once
+reader = create_recognizer("easyocr", lang_list=['en'], gpu=False,
+                           allowlist=string.ascii_uppercase + string.digits)
 
 # Mapping dictionaries for character conversion
 dict_char_to_int = {'O': '0',
@@ -105,28 +108,40 @@ def format_license(text):
     return license_plate_
 
 
-def read_license_plate(license_plate_crop):
+def read_license_plates(license_plate_crops):
     """
-    Read the license plate text from the given cropped image.
+    Read the license plate texts of several cropped images, in a single OCR call.
 
     Args:
-        license_plate_crop (PIL.Image.Image): Cropped image containing the license plate.
+        license_plate_crops (list): Cropped images containing the license plates, as numpy arrays.
 
     Returns:
-        tuple: Tuple containing the formatted license plate text and its confidence score.
+        list: Tuple of the formatted license plate text and its confidence score for every crop,
+        (None, None) for the crops whose text does not comply with the format.
     """
+    license_plates = []
+    for text, score in reader.recognize(license_plate_crops):
+        text = text.upper().replace(' ', '')
 
-    detections = reader.readtext(license_plate_crop)
+        if license_complies_format(text):
+            license_plates.append((format_license(text), score))
+        else:
+            license_plates.append((None, None))
 
-    for detection in detections:
-        bbox, text, score = detection
+    return license_plates
 
-        text = text.upper().replace(' ', '')
 
-        if license_complies_format(text):
-            return format_license(text), score
+def read_license_plate(license_plate_crop):
+    """
+    Read the license plate text from the given cropped image.
 
-    return None, None
+    Args:
+        license_plate_crop (numpy.ndarray): Cropped image containing the license plate.
+
+    Returns:
+        tuple: Tuple containing the formatted license plate text and its confidence score.
+    """
+    return read_license_plates([license_plate_crop])[0]
 
 
 def get_car(license_plate, vehicle_track_ids):
@@ -155,3 +170,60 @@ def get_car(license_plate, vehicle_track_ids):
         return vehicle_track_ids[car_indx]
 
     return -1, -1, -1, -1, -1
+
+
+def assign_cars(license_plates, vehicle_track_ids, min_containment=0.9, method='hungarian'):
+    """
+    Assign every license plate of a frame to a vehicle track, globally and at most one plate per vehicle.
+
+    The share of each plate's area inside each vehicle box is computed for all the pairs at once. Pairs below
+    min_containment are excluded, and the others are scored by their containment, lowered when the plate is off
+    the horizontal center of the vehicle, so that a plate inside two overlapping boxes goes to the vehicle it is
+    centered on. The assignment maximizes the total score (Hungarian), or takes the best pairs first (greedy).
+
+    Args:
+        license_plates (list): License plates (x1, y1, x2, y2, score, class_id).
+        vehicle_track_ids (numpy.ndarray): Vehicle tracks (x1, y1, x2, y2, car_id).
+        min_containment (float): Minimum share of the plate area inside the vehicle box.
+        method (str): 'hungarian' or 'greedy'.
+
+    Returns:
+        list: Vehicle coordinates (x1, y1, x2, y2) and ID of every license plate, as returned by get_car,
+        (-1, -1, -1, -1, -1) for the plates without vehicle.
+    """
+    assignments = [(-1, -1, -1, -1, -1)] * len(license_plates)
+    if len(license_plates) == 0 or len(vehicle_track_ids) == 0:
+        return assignments
+
+    plates = np.asarray(license_plates, dtype=float)[:, None, :4]
+    cars = np.asarray(vehicle_track_ids, dtype=float)[None, :, :4]
+
+    # Plates x vehicles containment matrix
+    width = np.clip(np.minimum(plates[..., 2], cars[..., 2]) - np.maximum(plates[..., 0], cars[..., 0]), 0, None)
+    height = np.clip(np.minimum(plates[..., 3], cars[..., 3]) - np.maximum(plates[..., 1], cars[..., 1]), 0, None)
+    plate_areas = np.maximum((plates[..., 2] - plates[..., 0]) * (plates[..., 3] - plates[..., 1]), 1e-9)
+    containment = width * height / plate_areas
+
+    # Horizontal offset of the plate from the center of the vehicle, 0 at the center and 1 at the sides
+    car_half_widths = np.maximum((cars[..., 2] - cars[..., 0]) / 2, 1e-9)
+    offset = np.abs((plates[..., 0] + plates[..., 2]) / 2 - (cars[..., 0] + cars[..., 2]) / 2) / car_half_widths
+    scores = np.where(containment >= min_containment, containment * (1 - 0.5 * np.clip(offset, 0, 1)), 0)
+
+    if method == 'hungarian':
+        plate_indices, car_indices = linear_sum_assignment(scores, maximize=True)
+    elif method == 'greedy':
+        plate_indices, car_indices = [], []
+        for index in np.argsort(-scores, axis=None):
+            plate_index, car_index = np.unravel_index(index, scores.shape)
+            if scores[plate_index, car_index] <= 0:
+                break
+            if plate_index not in plate_indices and car_index not in car_indices:
+                plate_indices.append(plate_index)
+                car_indices.append(car_index)
+    else:
+        raise ValueError("method must be 'hungarian' or 'greedy'")
+
+    for plate_index, car_index in zip(plate_indices, car_indices):
+        if scores[plate_index, car_index] > 0:
+            assignments[plate_index] = tuple(vehicle_track_ids[car_index])
+    return assignments
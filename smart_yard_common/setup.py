@@ -0,0 +1,30 @@
+from setuptools import setup, find_packages
+
+setup(
+    name='smart-yard-common',
+    version='0.1.0',
+    packages=find_packages(),
+    # OpenCV is not listed: the apps install opencv-python or opencv-python-headless at their own pinned version,
+    # and both provide cv2. The model runtimes are only imported by the helpers that use them.
+    install_requires=[
+        'numpy'
+    ],
+    extras_require={
+        'tiling': ['ultralytics>=8.0.114'],
+        'easyocr': ['easyocr>=1.7'],
+        'paddleocr': ['paddleocr>=2.7', 'paddlepaddle>=2.5'],
+        'onnx': ['onnxruntime>=1.16']
+    },
+    description='Lightweight helpers shared by the smart-yard apps: motion gating, tiled detection and plate OCR',
+    python_requires='>=3.7, <4'
+)
+
+"""
+smart-yard-common Setup
+
+Small helpers shared by the apps of the repository, without the TensorFlow and pinned ultralytics dependencies of
+the VehicleDetectionTracker package:
+- smart_yard_common.motion_gate: skips the detectors on static scenes.
+- smart_yard_common.tiling: runs a YOLO model on regions of interest of the frames, optionally cut in tiles.
+- smart_yard_common.plate_ocr: batched recognition of license plate crops with EasyOCR, PaddleOCR or an ONNX CRNN.
+"""
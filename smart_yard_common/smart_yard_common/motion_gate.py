@@ -0,0 +1,87 @@
+import cv2
+import numpy as np
+
+# Ways of detecting motion
+MOTION_METHODS = ("difference", "background")
+
+
+class MotionGate:
+
+    def __init__(self, method="difference", downscale_width=160, pixel_threshold=25, min_changed_fraction=0.002,
+                 refresh_interval=30, blur_size=5, history=500):
+        """
+        Initialize a cheap motion detector deciding whether a frame needs the full detector.
+
+        Frames are downscaled, converted to grayscale and blurred. With the "difference" method, a frame has motion
+        when it differs from the frame the detector last ran on, so slow vehicles are caught once they have moved
+        enough. With "background", a MOG2 background subtractor learns the static scene and reports the
+        foreground. The detector also runs every refresh_interval frames, whatever the motion.
+
+        Args:
+            method (str): One of MOTION_METHODS.
+            downscale_width (int): Width the frames are downscaled to, keeping their aspect ratio.
+            pixel_threshold (int): Minimum gray level difference of a changed pixel, for the "difference" method.
+            min_changed_fraction (float): Fraction of changed pixels above which the frame has motion.
+            refresh_interval (int or None): Run the detector at least every refresh_interval frames. None disables it.
+            blur_size (int): Size of the Gaussian blur filtering the sensor noise, 0 to disable it.
+            history (int): Number of frames the background model of the "background" method is learned over.
+        """
+        if method not in MOTION_METHODS:
+            raise ValueError(f"method must be one of {MOTION_METHODS}")
+        self.method = method
+        self.downscale_width = downscale_width
+        self.pixel_threshold = pixel_threshold
+        self.min_changed_fraction = min_changed_fraction
+        self.refresh_interval = refresh_interval
+        self.blur_size = blur_size
+        self.background_subtractor = cv2.createBackgroundSubtractorMOG2(history=history, detectShadows=False) \
+            if method == "background" else None
+        self.reference = None  # Downscaled frame the detector last ran on
+        self.frames_since_run = None  # None until the detector has run once
+        self.changed_fraction = 0.0  # Fraction of changed pixels of the last frame
+        self.stats = {"frames": 0, "detector_runs": 0, "refreshes": 0}
+
+    def _downscale(self, frame):
+        height, width = frame.shape[:2]
+        if width > self.downscale_width:
+            size = (self.downscale_width, max(1, round(height * self.downscale_width / width)))
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        if frame.ndim == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.blur_size:
+            frame = cv2.GaussianBlur(frame, (self.blur_size, self.blur_size), 0)
+        return frame
+
+    def should_run(self, frame):
+        """
+        Decide whether the detector has to run on a frame. The caller is expected to run it when True is returned,
+        and to reuse its previous results otherwise.
+
+        Args:
+            frame (numpy.ndarray): BGR frame.
+
+        Returns:
+            bool: True if the frame has motion, if the refresh interval has elapsed, or for the first frame.
+        """
+        self.stats["frames"] += 1
+        small = self._downscale(frame)
+        if self.method == "background":
+            foreground = self.background_subtractor.apply(small)
+            self.changed_fraction = np.count_nonzero(foreground) / foreground.size
+        elif self.reference is not None and self.reference.shape == small.shape:
+            difference = cv2.absdiff(small, self.reference)
+            self.changed_fraction = np.count_nonzero(difference > self.pixel_threshold) / difference.size
+        else:
+            self.changed_fraction = 1.0
+
+        run = self.frames_since_run is None or self.changed_fraction >= self.min_changed_fraction
+        if not run and self.refresh_interval is not None and self.frames_since_run + 1 >= self.refresh_interval:
+            run = True
+            self.stats["refreshes"] += 1
+        if run:
+            self.reference = small
+            self.frames_since_run = 0
+            self.stats["detector_runs"] += 1
+        else:
+            self.frames_since_run += 1
+        return run
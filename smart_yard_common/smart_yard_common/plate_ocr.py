@@ -0,0 +1,230 @@
+import cv2
+import numpy as np
+
+# Engines able to read the text of license plate crops
+OCR_BACKENDS = ("easyocr", "paddleocr", "onnx")
+
+# Height the crops are resized to by the recognition models of EasyOCR, the imgH of Reader.recognize
+EASYOCR_MODEL_HEIGHT = 64
+
+
+def _to_gray(image):
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+
+
+def _to_bgr(image):
+    return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR) if image.ndim == 2 else image
+
+
+class PlateRecognizer:
+    """
+    Base class of the text recognizers of license plate crops.
+
+    The crops are already tight around the plates, so only the recognition model runs, without text detection.
+    All the crops of a frame are recognized in a single call, batched by the engine.
+    """
+
+    def recognize(self, crops):
+        """
+        Read the text of license plate crops.
+
+        Args:
+            crops (list): Crops of the plates, as BGR or grayscale numpy arrays.
+
+        Returns:
+            list: (text, score) of every crop, in the order of the crops. The text is an empty string when
+            nothing was read.
+        """
+        raise NotImplementedError
+
+
+class EasyOcrRecognizer(PlateRecognizer):
+
+    def __init__(self, lang_list=("en",), gpu=False, allowlist=None, batch_size=16, decoder="greedy", beam_width=5):
+        """
+        Recognize plates with the recognition model of EasyOCR.
+
+        The crops are stacked into one grayscale canvas with one box per crop, and the recognition model of the
+        reader runs on the boxes in batches of batch_size, on the CPU as on the GPU. Reader.recognize is not used:
+        without a GPU, it runs the recognizer on its boxes one at a time.
+
+        Args:
+            lang_list (tuple): Languages of the reader.
+            gpu (bool): Run the reader on the GPU.
+            allowlist (str, optional): Characters the recognizer may output, e.g. uppercase letters and digits.
+            batch_size (int): Number of crops per forward pass of the recognizer.
+            decoder (str): Decoder of EasyOCR, "greedy" or "beamsearch".
+            beam_width (int): Beam width of the "beamsearch" decoder.
+        """
+        import easyocr
+        self.reader = easyocr.Reader(list(lang_list), gpu=gpu)
+        self.allowlist = allowlist
+        self.batch_size = batch_size
+        self.decoder = decoder
+        self.beam_width = beam_width
+        # Characters of the model the recognizer must not output, as computed by Reader.recognize
+        allowed = allowlist if allowlist is not None else self.reader.lang_char
+        self.ignore_char = ''.join(set(self.reader.character) - set(allowed))
+
+    def recognize(self, crops):
+        from easyocr.recognition import get_text
+        from easyocr.utils import get_image_list
+        if not crops:
+            return []
+        crops = [_to_gray(crop) for crop in crops]
+        width = max(crop.shape[1] for crop in crops)
+        canvas = np.zeros((sum(crop.shape[0] for crop in crops), width), dtype=np.uint8)
+        boxes, top = [], 0
+        for crop in crops:
+            height = crop.shape[0]
+            canvas[top:top + height, :crop.shape[1]] = crop
+            boxes.append([0, crop.shape[1], top, top + height])  # x_min, x_max, y_min, y_max
+            top += height
+        # Same as the GPU path of Reader.recognize, with its default thresholds
+        image_list, max_width = get_image_list(boxes, [], canvas, model_height=EASYOCR_MODEL_HEIGHT)
+        detections = get_text(self.reader.character, EASYOCR_MODEL_HEIGHT, int(max_width), self.reader.recognizer,
+                              self.reader.converter, image_list, self.ignore_char, self.decoder, self.beam_width,
+                              self.batch_size, contrast_ths=0.1, adjust_contrast=0.5, filter_ths=0.003, workers=0,
+                              device=self.reader.device)
+        # Detections come back with their box, which gives the crop they belong to
+        tops = np.array([box[2] for box in boxes])
+        results = [("", 0.0)] * len(crops)
+        for box, text, score in detections:
+            index = int(np.searchsorted(tops, box[0][1], side="right")) - 1
+            results[index] = (text, float(score))
+        return results
+
+
+class PaddleOcrRecognizer(PlateRecognizer):
+
+    def __init__(self, lang="en", rec_algorithm="CRNN", batch_size=16, **options):
+        """
+        Recognize plates with the recognition model of PaddleOCR, without its text detector.
+
+        Args:
+            lang (str): Language of the recognition model.
+            rec_algorithm (str): Recognition algorithm of PaddleOCR.
+            batch_size (int): Number of crops per forward pass of the recognizer.
+            **options: Other options of PaddleOCR.
+        """
+        from paddleocr import PaddleOCR
+        self.ocr = PaddleOCR(lang=lang, rec_algorithm=rec_algorithm, rec_batch_num=batch_size, use_angle_cls=False,
+                             show_log=False, **options)
+
+    def recognize(self, crops):
+        if not crops:
+            return []
+        # Same as PaddleOCR.ocr with det=False, for a list of crops instead of a single image
+        results, _ = self.ocr.text_recognizer([_to_bgr(crop) for crop in crops])
+        return [(text, float(score)) for text, score in results]
+
+
+class OnnxCrnnRecognizer(PlateRecognizer):
+
+    def __init__(self, model_file, alphabet, input_size=(100, 32), channels=1, mean=0.5, std=0.5, blank_index=0,
+                 time_major=False, apply_softmax=True, intra_op_threads=None):
+        """
+        Recognize plates with a CRNN model exported to ONNX, decoded with greedy CTC.
+
+        Crops are resized to the input height keeping their aspect ratio, padded on the right to the input width,
+        scaled to [0, 1] and normalized with mean and std, and run as one NCHW batch.
+
+        Args:
+            model_file (str): Path to the .onnx model.
+            alphabet (str): Characters of the output classes, in order, without the CTC blank.
+            input_size (tuple): Width and height of the input of the model.
+            channels (int): 1 for a grayscale input, 3 for an RGB input.
+            mean (float): Mean subtracted from the scaled pixels.
+            std (float): Standard deviation the centered pixels are divided by.
+            blank_index (int): Output class of the CTC blank, 0 or len(alphabet).
+            time_major (bool): The output is (T, N, C) instead of (N, T, C).
+            apply_softmax (bool): The model outputs logits, turned into probabilities for the scores.
+            intra_op_threads (int, optional): Threads used inside an operation, defaults to the ONNX Runtime default.
+        """
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads is not None:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(model_file, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.alphabet = alphabet
+        self.input_size = input_size
+        self.channels = channels
+        self.mean = mean
+        self.std = std
+        self.blank_index = blank_index
+        self.time_major = time_major
+        self.apply_softmax = apply_softmax
+
+    def preprocess(self, crops):
+        """
+        Args:
+            crops (list): Crops of the plates, as BGR or grayscale numpy arrays.
+
+        Returns:
+            numpy.ndarray: (N, C, H, W) float32 batch of the crops.
+        """
+        width, height = self.input_size
+        batch = np.zeros((len(crops), height, width, self.channels), dtype=np.float32)
+        for i, crop in enumerate(crops):
+            crop = _to_gray(crop) if self.channels == 1 else cv2.cvtColor(_to_bgr(crop), cv2.COLOR_BGR2RGB)
+            resized_width = min(width, max(1, round(crop.shape[1] * height / crop.shape[0])))
+            resized = cv2.resize(crop, (resized_width, height), interpolation=cv2.INTER_LINEAR)
+            batch[i, :, :resized_width] = resized.reshape((height, resized_width, self.channels))
+        batch /= 255.0
+        batch -= self.mean
+        batch /= self.std
+        return batch.transpose(0, 3, 1, 2).copy()
+
+    def decode(self, output):
+        """
+        Greedy CTC decoding: best class of every time step, repeated classes collapsed, blanks removed.
+
+        Args:
+            output (numpy.ndarray): (N, T, C) output of the model.
+
+        Returns:
+            list: (text, score) of every crop, the score being the mean probability of the characters kept.
+        """
+        if self.apply_softmax:
+            output = np.exp(output - output.max(axis=2, keepdims=True))
+            output /= output.sum(axis=2, keepdims=True)
+        classes, probabilities = output.argmax(axis=2), output.max(axis=2)
+        offset = 1 if self.blank_index == 0 else 0
+        results = []
+        for sequence, sequence_probabilities in zip(classes, probabilities):
+            keep = sequence != self.blank_index
+            keep[1:] &= sequence[1:] != sequence[:-1]
+            text = "".join(self.alphabet[c - offset] for c in sequence[keep])
+            score = float(sequence_probabilities[keep].mean()) if keep.any() else 0.0
+            results.append((text, score))
+        return results
+
+    def recognize(self, crops):
+        if not crops:
+            return []
+        output = self.session.run(None, {self.input_name: self.preprocess(crops)})[0]
+        if self.time_major:
+            output = output.transpose(1, 0, 2)
+        return self.decode(output)
+
+
+def create_recognizer(backend="easyocr", **options):
+    """
+    Create the recognizer of an OCR engine.
+
+    Args:
+        backend (str): One of OCR_BACKENDS.
+        **options: Options of the recognizer, see EasyOcrRecognizer, PaddleOcrRecognizer and OnnxCrnnRecognizer.
+
+    Returns:
+        PlateRecognizer: The recognizer.
+    """
+    if backend == "easyocr":
+        return EasyOcrRecognizer(**options)
+    if backend == "paddleocr":
+        return PaddleOcrRecognizer(**options)
+    if backend == "onnx":
+        return OnnxCrnnRecognizer(**options)
+    raise ValueError(f"Unknown OCR backend {backend}, expected one of {OCR_BACKENDS}")
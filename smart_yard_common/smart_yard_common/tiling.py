@@ -0,0 +1,197 @@
+import numpy as np
+
+# Overlap measures of the detections merged across crops
+MATCH_METRICS = ("iou", "ios")
+
+# Confidence threshold of the detections given to ByteTrack. Must stay equal to TRACKING_CONFIDENCE of
+# VehicleDetectionTracker.byte_tracking, which documents it: this package does not depend on VehicleDetectionTracker
+TRACKING_CONFIDENCE = 0.1
+
+
+def _results_class():
+    # The results module moved from ultralytics.yolo.engine to ultralytics.engine in 8.0.136
+    try:
+        from ultralytics.engine.results import Results
+    except ImportError:
+        from ultralytics.yolo.engine.results import Results
+    return Results
+
+
+def compute_tiles(region, tile_size, overlap=0.2):
+    """
+    Cover a region with tiles overlapping by a fraction of their size. The last tile of each row and column is
+    aligned with the border of the region, so every tile lies inside the region.
+
+    Args:
+        region (tuple): Region (x1, y1, x2, y2) to cover, in pixels.
+        tile_size (int or tuple): Size of the tiles, as a side or a (width, height) tuple.
+        overlap (float): Overlap of neighboring tiles, as a fraction of the tile size.
+
+    Returns:
+        list: Tiles (x1, y1, x2, y2).
+    """
+    x1, y1, x2, y2 = region
+    tile_width, tile_height = (tile_size, tile_size) if np.isscalar(tile_size) else tile_size
+
+    def starts(start, end, size):
+        if end - start <= size:
+            return [start]
+        step = max(1, int(size * (1 - overlap)))
+        positions = list(range(start, end - size, step))
+        positions.append(end - size)
+        return positions
+
+    tile_width, tile_height = min(tile_width, x2 - x1), min(tile_height, y2 - y1)
+    return [(x, y, x + tile_width, y + tile_height)
+            for y in starts(y1, y2, tile_height) for x in starts(x1, x2, tile_width)]
+
+
+def merge_detections(detections, match_threshold=0.5, match_metric="ios", merge_boxes=True):
+    """
+    Merge the duplicate detections of overlapping crops, greedily and class by class.
+
+    Detections are visited by decreasing confidence. Each one absorbs the remaining detections of its class that
+    overlap it by at least match_threshold. The "ios" metric (intersection over the smaller box) also matches the
+    part of a vehicle cut by a tile border with the full vehicle detected by the neighboring tile.
+
+    Args:
+        detections (numpy.ndarray): (N, 6) array of x1, y1, x2, y2, confidence, class.
+        match_threshold (float): Minimum overlap of two detections of the same object.
+        match_metric (str): One of MATCH_METRICS.
+        merge_boxes (bool): Replace the box of a detection by the union of the boxes it absorbs, instead of
+            only suppressing them as NMS does.
+
+    Returns:
+        numpy.ndarray: (M, 6) array of the merged detections.
+    """
+    if match_metric not in MATCH_METRICS:
+        raise ValueError(f"match_metric must be one of {MATCH_METRICS}")
+    if len(detections) < 2:
+        return detections
+    boxes, scores, classes = detections[:, :4], detections[:, 4], detections[:, 5]
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    order = np.argsort(-scores, kind="stable")
+    merged = []
+    while order.size > 0:
+        i, rest = order[0], order[1:]
+        width = np.minimum(boxes[i, 2], boxes[rest, 2]) - np.maximum(boxes[i, 0], boxes[rest, 0])
+        height = np.minimum(boxes[i, 3], boxes[rest, 3]) - np.maximum(boxes[i, 1], boxes[rest, 1])
+        intersection = np.clip(width, 0, None) * np.clip(height, 0, None)
+        if match_metric == "iou":
+            denominator = areas[i] + areas[rest] - intersection
+        else:
+            denominator = np.minimum(areas[i], areas[rest])
+        overlap = intersection / np.maximum(denominator, 1e-9)
+        matches = (overlap >= match_threshold) & (classes[rest] == classes[i])
+        detection = detections[i].copy()
+        if merge_boxes and matches.any():
+            matched = boxes[rest[matches]]
+            detection[:2] = np.minimum(detection[:2], matched[:, :2].min(axis=0))
+            detection[2:4] = np.maximum(detection[2:4], matched[:, 2:4].max(axis=0))
+        merged.append(detection)
+        order = rest[~matches]
+    return np.stack(merged)
+
+
+class TiledDetector:
+
+    def __init__(self, model, rois=None, tile_size=None, overlap=0.2, include_full_region=False,
+                 match_threshold=0.5, match_metric="ios", merge_boxes=True, **predict_options):
+        """
+        Initialize a detector running a YOLO model only on regions of interest of the frames, optionally cut in
+        tiles, in the way of SAHI (slicing aided hyper inference).
+
+        The crops of a frame are given to the model in a single batched call. Their detections are moved back to
+        frame coordinates and merged with merge_detections. On a high resolution camera, a gate lane cropped at
+        the native resolution shows small vehicles and plates with many more pixels than the whole frame scaled
+        down to the input size of the model, for a fraction of the compute of the full frame at full resolution.
+        The detector keeps no tracking state: VehicleDetectionTracker feeds its detections to the ByteTrack state
+        of its stream, the number plate app to SORT.
+
+        Args:
+            model (YOLO): Loaded YOLO model, which can be shared with other detectors.
+            rois (list, optional): Regions of interest (x1, y1, x2, y2) in pixels. The whole frame if omitted.
+            tile_size (int or tuple, optional): Size of the tiles the regions are cut in, e.g. 640. Regions are
+                given whole to the model if omitted.
+            overlap (float): Overlap of neighboring tiles, as a fraction of the tile size.
+            include_full_region (bool): Also run the model on each whole region, to detect the vehicles larger
+                than a tile.
+            match_threshold (float): Minimum overlap of the detections merged across crops.
+            match_metric (str): Overlap measure of the merge, one of MATCH_METRICS.
+            merge_boxes (bool): Merge the boxes of duplicate detections into their union, instead of suppressing them.
+            **predict_options: Options of YOLO.predict, e.g. conf or classes.
+        """
+        if match_metric not in MATCH_METRICS:
+            raise ValueError(f"match_metric must be one of {MATCH_METRICS}")
+        self.model = model
+        self.rois = [tuple(int(round(v)) for v in roi) for roi in rois] if rois is not None else None
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.include_full_region = include_full_region
+        self.match_threshold = match_threshold
+        self.match_metric = match_metric
+        self.merge_boxes = merge_boxes
+        self.predict_options = dict(predict_options, verbose=False)
+        self._crops = {}  # Frame shape -> crops of the frames of that shape
+
+    def crops(self, frame_shape):
+        """
+        Get the crops the model runs on, for frames of a given shape.
+
+        Args:
+            frame_shape (tuple): Shape of the frames.
+
+        Returns:
+            list: Crops (x1, y1, x2, y2), within the frame.
+        """
+        frame_shape = tuple(frame_shape[:2])
+        if frame_shape not in self._crops:
+            height, width = frame_shape
+            regions = []
+            for x1, y1, x2, y2 in self.rois or [(0, 0, width, height)]:
+                x1, y1, x2, y2 = max(x1, 0), max(y1, 0), min(x2, width), min(y2, height)
+                if x2 > x1 and y2 > y1:
+                    regions.append((x1, y1, x2, y2))
+            crops = []
+            for region in regions:
+                if self.tile_size is None:
+                    crops.append(region)
+                    continue
+                tiles = compute_tiles(region, self.tile_size, self.overlap)
+                crops.extend(tiles)
+                if self.include_full_region and len(tiles) > 1:
+                    crops.append(region)
+            self._crops[frame_shape] = crops
+        return self._crops[frame_shape]
+
+    def detect(self, frame, tracking=False):
+        """
+        Detect objects in the regions of interest of a frame.
+
+        Args:
+            frame (numpy.ndarray): BGR frame.
+            tracking (bool): The detections feed ByteTrack. Unless conf is set in the predict options, the
+                confidence threshold is then TRACKING_CONFIDENCE, as with YOLO.track, instead of the YOLO default.
+
+        Returns:
+            Results: Merged detections of every crop, in frame coordinates.
+        """
+        import torch
+        Results = _results_class()
+        predict_options = self.predict_options
+        if tracking and "conf" not in predict_options:
+            predict_options = dict(predict_options, conf=TRACKING_CONFIDENCE)
+        crops = self.crops(frame.shape)
+        # The crops are views of the frame, nothing is copied before the letterboxing of the model
+        results = self.model.predict([frame[y1:y2, x1:x2] for x1, y1, x2, y2 in crops], **predict_options) \
+            if crops else []
+        detections = []
+        for (x1, y1, _, _), result in zip(crops, results):
+            data = result.boxes.data.cpu().numpy()[:, :6].astype(np.float32)
+            data[:, [0, 2]] += x1
+            data[:, [1, 3]] += y1
+            detections.append(data)
+        detections = np.concatenate(detections) if detections else np.zeros((0, 6), dtype=np.float32)
+        if len(crops) > 1:
+            detections = merge_detections(detections, self.match_threshold, self.match_metric, self.merge_boxes)
+        return Results(frame, path="", names=self.model.names, boxes=torch.as_tensor(detections))
@@ -1,56 +1,95 @@
-import json
-import math
 import cv2
 import base64
-from collections import defaultdict
-from ultralytics import YOLO
+import time
 import numpy as np
-from ultralytics.utils.plotting import colors
-from VehicleDetectionTracker.color_classifier.classifier import Classifier as ColorClassifier
-from VehicleDetectionTracker.model_classifier.classifier import Classifier as ModelClassifier
+from VehicleDetectionTracker.attribute_cache import TrackAttributeCache
+from VehicleDetectionTracker.byte_tracking import TRACKING_CONFIDENCE, create_byte_tracker, update_tracks
+from VehicleDetectionTracker.classification_policy import ClassificationPolicy
+from VehicleDetectionTracker.frame_preprocessor import FramePreprocessor
+from VehicleDetectionTracker.track_state import TrackState
+from VehicleDetectionTracker.speed_estimator import SpeedEstimator, directions_to_labels, _to_seconds
+from VehicleDetectionTracker.video_pipeline import VideoPipeline
+from VehicleDetectionTracker.frame_envelope import unpack_frame, decode_frame
 from datetime import datetime
 
+# Formats in which images can be returned in the responses of process_frame
+IMAGE_FORMATS = ("ndarray", "jpeg", "base64")
+
 class VehicleDetectionTracker:
 
-    def __init__(self, model_path="yolov8n.pt"):
+    def __init__(self, model_path="yolov8n.pt", attribute_cache=None, model=None, color_classifier=None, model_classifier=None,
+                 track_state=None, pixels_per_meter=None, speed_smoothing="window", classification_policy=None,
+                 frame_stride=None, motion_gate=None, preprocessor=None, region_detector=None, byte_tracker=None):
         """
         Initialize the VehicleDetection class.
 
         Args:
             model_path (str): Path to the YOLO model file.
+            attribute_cache (TrackAttributeCache, optional): Cache of the color and model classification of
+                each tracked vehicle, with its re-classification policy. A default cache is created if omitted.
+            model (YOLO, optional): Already loaded YOLO model, shared with other trackers. model_path is ignored if given.
+            color_classifier (ColorClassifier, optional): Already loaded color classifier, shared with other trackers.
+            model_classifier (ModelClassifier, optional): Already loaded make and model classifier, shared with other trackers.
+            track_state (TrackState, optional): Bounded state of the tracked vehicles, with its history length and
+                eviction policy. A default state is created if omitted.
+            pixels_per_meter (float, optional): Camera calibration used by the default track state to convert
+                pixel speeds into km/h. Without it, speeds are computed in pixels per second.
+            speed_smoothing (str): Speed smoothing of the default track state, "window", "ema" or "kalman".
+            classification_policy (ClassificationPolicy, optional): Decides which detections are classified, and
+                cropped and encoded in the responses. Every detection is by default.
+            frame_stride (AdaptiveStride, optional): Runs the detector only on some frames of process_frame, and of
+                MultiStreamTracker.process_frames, and moves the tracks with their motion model on the others. The detector runs on every frame if omitted.
+            motion_gate (smart_yard_common.motion_gate.MotionGate, optional): Skips the detector on the frames
+                without motion, reusing the last detection as is. The detector runs on every frame if omitted.
+            preprocessor (FramePreprocessor, optional): Preprocessing of the frames given to the detector. Defaults
+                to a gain of 1.5, written into a reused buffer.
+            region_detector (smart_yard_common.tiling.TiledDetector, optional): Runs the detector only on regions
+                of interest of the frames, optionally cut in tiles. Its merged detections are tracked with the
+                byte_tracker of this tracker, created if omitted. The whole frame is given to the model if omitted.
+            byte_tracker (BYTETracker, optional): ByteTrack state of this tracker's stream. With it, the model runs
+                with YOLO.predict and its detections are tracked with this state, so several trackers can share one
+                model. Without it, YOLO.track keeps the ByteTrack state inside the model, which must then not be
+                shared.
         """
         # Load the YOLO model and set up data structures for tracking.
-        self.model = YOLO(model_path)
-        self.track_history = defaultdict(lambda: [])  # History of vehicle tracking
-        self.detected_vehicles = set()  # Set of detected vehicles
-        self.color_classifier = None
-        self.model_classifier = None
-        self.vehicle_timestamps = defaultdict(list)  # Keep track of timestamps for each tracked vehicle
+        # ultralytics is only imported here, so that importing the package stays cheap.
+        if model is None:
+            from ultralytics import YOLO
+            model = YOLO(model_path)
+        self.model = model
+        if track_state is None:
+            track_state = TrackState(speed_estimator_factory=lambda: SpeedEstimator(smoothing=speed_smoothing,
+                                                                                    pixels_per_meter=pixels_per_meter))
+        self.track_state = track_state  # History and speed estimation of vehicle tracking
+        self.detected_vehicles = set()  # Set of detected vehicles that are still tracked
+        self.color_classifier = color_classifier
+        self.model_classifier = model_classifier
+        self.attribute_cache = attribute_cache if attribute_cache is not None else TrackAttributeCache()
+        self.classification_policy = classification_policy if classification_policy is not None else ClassificationPolicy()
+        self.frame_stride = frame_stride
+        self.motion_gate = motion_gate
+        self.preprocessor = preprocessor if preprocessor is not None else FramePreprocessor()
+        self.region_detector = region_detector
+        self.byte_tracker = byte_tracker
+        self.frame_index = 0  # Number of frames processed so far
+        self.last_detections = []  # Vehicles of the last detection, moved on the frames the detector skips
+        self._last_frame_time = None
+        self._frame_interval = None  # Time elapsed since the previous frame, in seconds
+        self._prepare_time = 0.0  # Time spent in prepare_frame on the last frame, in seconds
 
 
     def _initialize_classifiers(self):
+        # The classifier stack and its inference backend are imported when the first vehicle is classified
         if self.color_classifier is None:
+            from VehicleDetectionTracker.color_classifier.classifier import Classifier as ColorClassifier
             self.color_classifier = ColorClassifier()
         if self.model_classifier is None:
+            from VehicleDetectionTracker.model_classifier.classifier import Classifier as ModelClassifier
             self.model_classifier = ModelClassifier()
 
     def _map_direction_to_label(self, direction):
-        # Define direction ranges in radians and their corresponding labels
-        direction_ranges = {
-            (-math.pi / 8, math.pi / 8): "Right",
-            (math.pi / 8, 3 * math.pi / 8): "Bottom Right",
-            (3 * math.pi / 8, 5 * math.pi / 8): "Bottom",
-            (5 * math.pi / 8, 7 * math.pi / 8): "Bottom Left",
-            (7 * math.pi / 8, -7 * math.pi / 8): "Left",
-            (-7 * math.pi / 8, -5 * math.pi / 8): "Top Left",
-            (-5 * math.pi / 8, -3 * math.pi / 8): "Top",
-            (-3 * math.pi / 8, -math.pi / 8): "Top Right"
-        }
-        for angle_range, label in direction_ranges.items():
-            if angle_range[0] <= direction <= angle_range[1]:
-                return label
-        return "Unknown"  # Return "Unknown" if the direction doesn't match any defined range
-
+        # Map a direction in radians to one of the 8 compass labels of image coordinates
+        return directions_to_labels(np.array([direction]))[0] or "Unknown"
 
     def _encode_image_base64(self, image):
         """
@@ -65,7 +104,78 @@ class VehicleDetectionTracker:
         _, buffer = cv2.imencode('.jpg', image)
         image_base64 = base64.b64encode(buffer).decode()
         return image_base64
-    
+
+    def _encode_image(self, image, image_format):
+        """
+        Encode an image in one of the response formats.
+
+        Args:
+            image (numpy.ndarray): The image to be encoded.
+            image_format (str): "ndarray" to return the image as is, "jpeg" for JPEG bytes or "base64" for a base64-encoded JPEG.
+
+        Returns:
+            numpy.ndarray, bytes or str: The encoded image.
+        """
+        if image_format == "ndarray":
+            return image
+        if image_format == "jpeg":
+            _, buffer = cv2.imencode('.jpg', image)
+            return buffer.tobytes()
+        return self._encode_image_base64(image)
+
+    def _set_response_image(self, container, key, image, image_format):
+        """
+        Store an encoded image in a response dict, under "<key>_base64" for base64 images and "<key>" otherwise.
+        """
+        if image_format == "base64":
+            container[key + "_base64"] = self._encode_image_base64(image)
+        else:
+            container[key + "_base64"] = None
+            container[key] = self._encode_image(image, image_format)
+
+    def _track_directions(self, tracks):
+        """
+        Compute the heading of several tracks at once.
+
+        Returns:
+            tuple: Directions in radians (NaN for the tracks seen only once) and their labels (None for them).
+        """
+        heading_vectors = np.array([track["speed"].heading_vector() for track in tracks], dtype=np.float64).reshape((-1, 2))
+        directions = np.arctan2(heading_vectors[:, 1], heading_vectors[:, 0])
+        return directions, directions_to_labels(directions)
+
+    def _vehicle_info(self, track_id, label, conf, x, y, w, h, frame_timestamp, speed_estimator, direction, direction_label):
+        # Vehicle information of the responses, the color and model are filled from the attribute cache
+        return {
+            "vehicle_id": track_id,
+            "vehicle_type": label,
+            "detection_confidence": conf,
+            "vehicle_coordinates": {
+                "x": x,
+                "y": y,
+                "width": w,
+                "height": h
+            },
+            "vehicle_frame_base64": None,
+            "vehicle_frame_timestamp": frame_timestamp,
+            "color_info": None,
+            "model_info": None,
+            "speed_info": {
+                "kph": speed_estimator.speed_kph(),
+                "reliability": speed_estimator.reliability(),
+                "direction_label": direction_label,
+                "direction": None if np.isnan(direction) else float(direction)
+            }
+        }
+
+    def _fill_attributes(self, vehicles):
+        # Every vehicle takes its color and model from the cache
+        for vehicle in vehicles:
+            attributes = self.attribute_cache.get(vehicle["vehicle_id"])
+            if attributes is not None:
+                vehicle["color_info"] = attributes["color_info"]
+                vehicle["model_info"] = attributes["model_info"]
+
     def _decode_image_base64(self, image_base64):
         """
         Decode a base64-encoded image.
@@ -84,28 +194,14 @@ class VehicleDetectionTracker:
         except Exception as e:
             return None
         
-    def _increase_brightness(self, image, factor=1.5):
-        """
-        Increases the brightness of an image by multiplying its pixels by a factor.
-
-        :param image: The input image in numpy array format.
-        :param factor: The brightness increase factor. A value greater than 1 will increase brightness.
-        :return: The image with increased brightness.
-        """
-        brightened_image = cv2.convertScaleAbs(image, alpha=factor, beta=0)
-        return brightened_image
-
-    def _convert_meters_per_second_to_kmph(self, meters_per_second):
-        # 1 m/s is approximately 3.6 km/h
-        kmph = meters_per_second * 3.6
-        return kmph
-
-    def process_frame_base64(self, frame_base64, frame_timestamp):
+    def process_frame_base64(self, frame_base64, frame_timestamp, **response_options):
         """
         Process a base64-encoded frame to detect and track vehicles.
 
         Args:
             frame_base64 (str): Base64-encoded input frame for processing.
+            **response_options: Options forwarded to process_frame (include_original, include_annotated,
+                include_crops, crop_format and frame_format).
 
         Returns:
             dict or None: Processed information including tracked vehicles' details and the annotated frame in base64,
@@ -113,192 +209,422 @@ class VehicleDetectionTracker:
         """
         frame = self._decode_image_base64(frame_base64)
         if frame is not None:
-            return self.process_frame(frame, frame_timestamp)
+            return self.process_frame(frame, frame_timestamp, **response_options)
         else:
             return {
                 "error": "Failed to decode the base64 image"
             }
 
-    def process_frame(self, frame, frame_timestamp):
+    def process_frame_bytes(self, data, **response_options):
+        """
+        Process a frame packed in a binary envelope (see frame_envelope) to detect and track vehicles.
+
+        The envelope is read through a memoryview, and raw BGR frames are processed without copying their pixels.
+
+        Args:
+            data (bytes, bytearray or memoryview): Binary envelope of the frame.
+            **response_options: Options forwarded to process_frame (include_original, include_annotated,
+                include_crops, crop_format and frame_format).
+
+        Returns:
+            dict: Processed information including tracked vehicles' details and the camera ID of the envelope,
+            or an error message if decoding fails.
+        """
+        try:
+            envelope = unpack_frame(data)
+        except ValueError as e:
+            return {
+                "error": f"Failed to unpack the frame envelope: {e}"
+            }
+        frame = decode_frame(envelope)
+        if frame is None:
+            return {
+                "error": "Failed to decode the frame of the envelope"
+            }
+        response = self.process_frame(frame, envelope.frame_timestamp, **response_options)
+        response["camera_id"] = envelope.camera_id
+        return response
+
+    def process_frame(self, frame, frame_timestamp, **response_options):
         """
         Process a single video frame to detect and track vehicles.
 
         Args:
             frame (numpy.ndarray): Input frame for processing.
+            **response_options: Options of the response, see process_tracking_result.
+
+        Returns:
+            dict: Processed information including tracked vehicles' details, the annotated frame and the original frame.
+        """
+        response = self.prepare_frame(frame, frame_timestamp, **response_options)
+        if response is not None:
+            return response
+
+        # Perform vehicle tracking in the frame, or in its regions of interest
+        start = time.perf_counter()
+        result = self.detect(self.preprocessor.apply(frame))
+        return self.finish_frame(frame, frame_timestamp, result, time.perf_counter() - start, **response_options)
+
+    def prepare_frame(self, frame, frame_timestamp, **response_options):
+        """
+        First step of process_frame: record the timestamp of the frame, and build its response without running
+        the detector when the motion gate finds the scene static or the frame stride skips the frame.
+
+        Args:
+            frame (numpy.ndarray): Input frame for processing.
+            frame_timestamp (datetime): Timestamp of the frame.
+            **response_options: Options of the response, see process_tracking_result.
 
         Returns:
-            dict: Processed information including tracked vehicles' details, the annotated frame in base64, and the original frame in base64.
+            dict or None: Response of the frame when the detector is skipped, None when it has to run.
+        """
+        start = time.perf_counter()
+        frame_time = _to_seconds(frame_timestamp)
+        self._frame_interval = None
+        if self._last_frame_time is not None and frame_time > self._last_frame_time:
+            self._frame_interval = frame_time - self._last_frame_time
+        self._last_frame_time = frame_time
+
+        # On static scenes, reuse the last detection as is
+        if self.motion_gate is not None and not self.motion_gate.should_run(frame):
+            return self.propagate_tracks(frame, frame_timestamp, use_velocity=False, **response_options)
+
+        # On the frames the stride skips, move the vehicles of the last detection instead of detecting them
+        if self.frame_stride is not None and not self.frame_stride.should_detect():
+            response = self.propagate_tracks(frame, frame_timestamp, **response_options)
+            self.frame_stride.update(False, time.perf_counter() - start)
+            return response
+        self._prepare_time = time.perf_counter() - start
+        return None
+
+    def finish_frame(self, frame, frame_timestamp, result, detection_time, **response_options):
         """
-        self._initialize_classifiers()
+        Last step of process_frame, once prepare_frame returned None: build the response of the tracking result of
+        the frame, and record the processing time of the frame in the frame stride.
+
+        Args:
+            frame (numpy.ndarray): Input frame for processing.
+            frame_timestamp (datetime): Timestamp of the frame.
+            result (ultralytics.engine.results.Results): Tracking result of the frame, as returned by detect.
+            detection_time (float): Time spent by the detector on the frame, in seconds.
+            **response_options: Options of the response, see process_tracking_result.
+
+        Returns:
+            dict: Processed information of the frame, as returned by process_frame.
+        """
+        start = time.perf_counter()
+        response = self.process_tracking_result(frame, frame_timestamp, result, **response_options)
+        if self.frame_stride is not None:
+            elapsed = self._prepare_time + detection_time + time.perf_counter() - start
+            self.frame_stride.update(True, elapsed, self._frame_motion(self._frame_interval))
+        return response
+
+    def detect(self, image):
+        """
+        Run the detector on a preprocessed frame and track its detections.
+
+        Args:
+            image (numpy.ndarray): Frame returned by the preprocessor.
+
+        Returns:
+            ultralytics.engine.results.Results or None: Tracking result of the frame.
+        """
+        if self.region_detector is not None:
+            detections = self.region_detector.detect(image, tracking=True)
+        elif self.byte_tracker is not None:
+            detections = self.model.predict(image, conf=TRACKING_CONFIDENCE, verbose=False)[0]
+        else:
+            results = self.model.track(image, persist=True, tracker="bytetrack.yaml")
+            return results[0] if results is not None else None
+        if self.byte_tracker is None:
+            self.byte_tracker = create_byte_tracker()
+        return update_tracks(detections, self.byte_tracker, image)
+
+    def _frame_motion(self, frame_interval):
+        # Displacement of the fastest vehicle of the last detection between two consecutive frames, in pixels
+        if frame_interval is None:
+            return None
+        speeds = [detection["track"]["speed"].speed_pixels_per_second() for detection in self.last_detections]
+        speeds = [speed for speed in speeds if speed is not None]
+        return max(speeds) * frame_interval if speeds else 0.0
+
+    def propagate_tracks(self, frame, frame_timestamp, include_original=True, include_annotated=True,
+                         include_crops=True, crop_format="base64", frame_format="base64", use_velocity=True):
+        """
+        Build the response of a frame without running the detector, by moving the vehicles of the last detection
+        with the velocity of their track.
+
+        The track state is not updated with the predicted positions, so speeds and headings only come from
+        detections. The response has the same layout as the one of process_tracking_result, with "interpolated"
+        set to True.
+
+        Args:
+            frame (numpy.ndarray): Input frame.
+            frame_timestamp (datetime): Timestamp of the frame.
+            include_original (bool): Whether to return the original frame.
+            include_annotated (bool): Whether to draw and return the annotated frame.
+            include_crops (bool): Whether to return the crop of each vehicle, at its predicted position.
+            crop_format (str): Format of the vehicle crops, one of IMAGE_FORMATS.
+            frame_format (str): Format of the original and annotated frames, one of IMAGE_FORMATS.
+            use_velocity (bool): Move the vehicles with their velocity, or keep them at their last detected position.
+
+        Returns:
+            dict: Processed information including the predicted vehicles' details, the annotated frame and the original frame.
+        """
+        if crop_format not in IMAGE_FORMATS or frame_format not in IMAGE_FORMATS:
+            raise ValueError(f"Image formats must be one of {IMAGE_FORMATS}")
+        self.frame_index += 1
+        response = {
+            "number_of_vehicles_detected": len(self.last_detections),
+            "detected_vehicles": [],
+            "annotated_frame_base64": None,
+            "original_frame_base64": None,
+            "interpolated": True
+        }
+        frame_time = _to_seconds(frame_timestamp)
+        frame_height, frame_width = frame.shape[:2]
+        annotated_frame = None
+        if include_annotated:
+            from ultralytics.utils.plotting import colors
+            annotated_frame = frame.copy()
+        directions, direction_labels = self._track_directions([detection["track"] for detection in self.last_detections])
+
+        for i, detection in enumerate(self.last_detections):
+            # Constant velocity motion model from the last detection of the vehicle
+            x, y, w, h = detection["coordinates"]
+            velocity = detection["track"]["speed"].velocity() if use_velocity else None
+            if velocity is not None:
+                elapsed = frame_time - detection["time"]
+                x, y = x + velocity[0] * elapsed, y + velocity[1] * elapsed
+            x1, y1 = int(min(max(x - w / 2, 0), frame_width)), int(min(max(y - h / 2, 0), frame_height))
+            x2, y2 = int(min(max(x + w / 2, 0), frame_width)), int(min(max(y + h / 2, 0), frame_height))
+            if annotated_frame is not None:
+                color = colors(detection["cls"], True)
+                cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), color, 2)
+                cv2.putText(annotated_frame, f"id:{detection['vehicle_id']} {detection['vehicle_type']}", (x1, max(y1 - 5, 0)),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+
+            vehicle_info = self._vehicle_info(detection["vehicle_id"], detection["vehicle_type"],
+                                              detection["detection_confidence"], x, y, w, h, frame_timestamp,
+                                              detection["track"]["speed"], directions[i], direction_labels[i])
+            if include_crops and (detection["eligible"] or not self.classification_policy.crop_eligible_only):
+                self._set_response_image(vehicle_info, "vehicle_frame", frame[y1:y2, x1:x2], crop_format)
+            response["detected_vehicles"].append(vehicle_info)
+
+        self._fill_attributes(response["detected_vehicles"])
+        if annotated_frame is not None:
+            self._set_response_image(response, "annotated_frame", annotated_frame, frame_format)
+        if include_original:
+            self._set_response_image(response, "original_frame", frame, frame_format)
+        return response
+
+    def process_tracking_result(self, frame, frame_timestamp, result, include_original=True, include_annotated=True,
+                                include_crops=True, crop_format="base64", frame_format="base64"):
+        """
+        Build the response of a frame from the tracking result of the YOLO model.
+
+        The tracking result may come from this tracker's own model or from a model shared by several trackers,
+        as long as its boxes carry the track IDs of this tracker's stream.
+
+        Args:
+            frame (numpy.ndarray): Input frame, as given to process_frame.
+            frame_timestamp (datetime): Timestamp of the frame.
+            result (ultralytics.engine.results.Results or None): Tracking result of the frame.
+            include_original (bool): Whether to return the original frame.
+            include_annotated (bool): Whether to plot and return the annotated frame.
+            include_crops (bool): Whether to return the crop of each detected vehicle.
+            crop_format (str): Format of the vehicle crops, one of IMAGE_FORMATS.
+            frame_format (str): Format of the original and annotated frames, one of IMAGE_FORMATS.
+
+        Returns:
+            dict: Processed information including tracked vehicles' details, the annotated frame and the original frame.
+            Images in base64 are returned under the "*_base64" keys, images in other formats under the same key
+            without the suffix. Images that are not requested are neither plotted nor encoded.
+        """
+        if crop_format not in IMAGE_FORMATS or frame_format not in IMAGE_FORMATS:
+            raise ValueError(f"Image formats must be one of {IMAGE_FORMATS}")
+        self.frame_index += 1
         response = {
             "number_of_vehicles_detected": 0,  # Counter for vehicles detected in this frame
             "detected_vehicles": [],  # List of information about detected vehicles
             "annotated_frame_base64": None,  # Annotated frame as a base64 encoded image
-            "original_frame_base64": None  # Original frame as a base64 encoded image
+            "original_frame_base64": None,  # Original frame as a base64 encoded image
+            "interpolated": False  # Whether the vehicles were moved by their motion model instead of detected
         }
-        # Process a single video frame and return detection results, an annotated frame, and the original frame as base64.
-        results = self.model.track(self._increase_brightness(frame), persist=True, tracker="bytetrack.yaml")  # Perform vehicle tracking in the frame
-        if results is not None and results[0] is not None and results[0].boxes is not None and results[0].boxes.id is not None:
+        self.last_detections = []
+        # Process the tracking result and return detection results, an annotated frame, and the original frame.
+        if result is not None and result.boxes is not None and result.boxes.id is not None:
             # Obtain bounding boxes (xywh format) of detected objects
-            boxes = results[0].boxes.xywh.cpu()
+            boxes = result.boxes.xywh.cpu().numpy()
             # Extract confidence scores for each detected object
-            conf_list = results[0].boxes.conf.cpu()
+            conf_list = result.boxes.conf.cpu().numpy().tolist()
             # Get unique IDs assigned to each tracked object
-            track_ids = results[0].boxes.id.int().cpu().tolist()
+            track_ids = result.boxes.id.int().cpu().tolist()
             # Obtain the class labels (e.g., 'car', 'truck') for detected objects
-            clss = results[0].boxes.cls.cpu().tolist()
+            clss = result.boxes.cls.cpu().tolist()
             # Retrieve the names of the detected objects based on class labels
-            names = results[0].names
-            # Get the annotated frame using results[0].plot() and encode it as base64
-            annotated_frame = results[0].plot()
-
-            for box, track_id, cls, conf in zip(boxes, track_ids, clss, conf_list):
-                x, y, w, h = box
+            names = result.names
+            # Get the annotated frame using result.plot(), only if it has been requested
+            annotated_frame = None
+            if include_annotated:
+                from ultralytics.utils.plotting import colors
+                annotated_frame = result.plot()
+            # Indices of the vehicles of this frame that need to be (re-)classified, and their crops
+            classification_candidates = []
+            vehicle_frames_by_index = {}
+
+            # Crop coordinates (x1, y1, x2, y2) of every box, clipped to the frame, and box areas
+            frame_height, frame_width = frame.shape[:2]
+            centers, half_sizes = boxes[:, :2], boxes[:, 2:4] / 2
+            crop_boxes = np.concatenate([centers - half_sizes, centers + half_sizes], axis=1)
+            crop_boxes = np.clip(crop_boxes, 0, [frame_width, frame_height, frame_width, frame_height]).astype(np.int32).tolist()
+            areas = (boxes[:, 2] * boxes[:, 3]).tolist()
+            coordinates = boxes.tolist()
+            # Detections that the policy allows to classify, and to crop
+            eligible = self.classification_policy.eligible([str(names[cls]) for cls in clss], np.array(conf_list), boxes).tolist()
+
+            # Append the current position (x, y) and timestamp to the bounded history of every vehicle (identified by track_id)
+            tracks = [self.track_state.update(track_id, self.frame_index, frame_timestamp, x, y)
+                      for track_id, (x, y, _, _) in zip(track_ids, coordinates)]
+            # Headings of every track and their labels, NaN and None for the tracks seen only once
+            directions, direction_labels = self._track_directions(tracks)
+            frame_time = _to_seconds(frame_timestamp)
+
+            for i, (track_id, cls, conf, track) in enumerate(zip(track_ids, clss, conf_list, tracks)):
+                x, y, w, h = coordinates[i]
                 label = str(names[cls])
-                # Bounding box plot
-                bbox_color = colors(cls, True)
-                track_thickness=2
-                if track_id not in self.track_history:
-                    self.track_history[track_id] = []
-                # Retrieve or create a list to store the tracking history of the current vehicle (identified by track_id).
-                track = self.track_history[track_id]
-                # Append the current position (x, y) to the tracking history list.
-                track.append((float(x), float(y)))
-                # Limit the tracking history to the last 30 positions to avoid excessive memory usage.
-                max_history_length = 30
-                if len(track) > max_history_length:
-                    track.pop(0)
-                # Combine the tracked points into a NumPy array for drawing a polyline.
-                points = np.hstack(track).astype(np.int32).reshape((-1, 1, 2))
-                # Draw a polyline (tracking lines) on the annotated frame using the combined points.
-                cv2.polylines(annotated_frame, [points], isClosed=False, color=bbox_color, thickness=track_thickness)
-
-                if track_id not in self.vehicle_timestamps:
-                    self.vehicle_timestamps[track_id] = {"timestamps": [], "positions": []}  # Initialize timestamps and positions lists
-
-                # Store the timestamp for this frame
-                self.vehicle_timestamps[track_id]["timestamps"].append(frame_timestamp)
-                self.vehicle_timestamps[track_id]["positions"].append((x, y))
-                # Calculate the speed if there are enough timestamps (at least 2)
-                timestamps = self.vehicle_timestamps[track_id]["timestamps"]
-                positions = self.vehicle_timestamps[track_id]["positions"]
-                speed_kph = None
-                reliability = 0.0
-                direction_label = None
-                direction = None
-                if len(timestamps) >= 2:
-                    delta_t_list = []
-                    distance_list = []
-                    # Calculate time intervals (delta_t) and distances traveled between successive frames
-                    for i in range(1, len(timestamps)):
-                        t1, t2 = timestamps[i - 1], timestamps[i]
-                        delta_t = t2.timestamp() - t1.timestamp()
-                        if delta_t > 0:
-                            x1, y1 = positions[i - 1]
-                            x2, y2 = positions[i]
-                            distance = math.sqrt((x2 - x1) ** 2 + (y2 - y1) ** 2)
-                            delta_t_list.append(delta_t)
-                            distance_list.append(distance)
-
-                    
-                    # Calculate speeds in meters per second (mps) for each frame and then average them
-                    speeds = [distance / delta_t for distance, delta_t in zip(distance_list, delta_t_list)]
-                    if len(speeds) > 0:
-                        avg_speed_mps = sum(speeds) / len(speeds)
-                    else:
-                        avg_speed_mps = None
-
-                    # Convert the average speed from meters per second (mps) to kilometers per hour (kph)
-                    if avg_speed_mps is not None:
-                        speed_kph = self._convert_meters_per_second_to_kmph(avg_speed_mps)
-                    else:
-                        speed_kph = None
-                    # Calculate the direction based on the change in position between the first and last frame
-                    initial_x, initial_y = positions[0]
-                    final_x, final_y = positions[-1]
-                    direction = math.atan2(final_y - initial_y, final_x - initial_x)
-                    direction_label = self._map_direction_to_label(direction)
-
-                    # Calculate reliability based on the number of samples used
-                    if len(timestamps) < 5:
-                        reliability = 0.5  # Low reliability if there are less than 5 samples
-                    elif len(timestamps) < 10:
-                        reliability = 0.7  # Moderate reliability if there are between 5 and 10 samples
-                    else:
-                        reliability = 1.0  # High reliability if there are 10 or more samples
-
+                if annotated_frame is not None:
+                    # Combine the tracked points into a NumPy array for drawing a polyline (tracking lines) on the annotated frame.
+                    points = np.array(track["positions"], dtype=np.int32).reshape((-1, 1, 2))
+                    cv2.polylines(annotated_frame, [points], isClosed=False, color=colors(cls, True), thickness=2)
 
                 # If the vehicle is new, process it
                 self.detected_vehicles.add(track_id)  # Add the vehicle to the set of detected vehicles
                 response["number_of_vehicles_detected"] += 1  # Increment the counter
 
-                # Extract the frame of the detected vehicle
-                vehicle_frame = frame[int(y - h / 2):int(y + h / 2), int(x - w / 2):int(x + w / 2)]
-                vehicle_frame_base64 = self._encode_image_base64(vehicle_frame)
-                color_info = self.color_classifier.predict(vehicle_frame)
-                color_info_json = json.dumps(color_info)
-                model_info = self.model_classifier.predict(vehicle_frame)
-                model_info_json = json.dumps(model_info)
-    
-                 # Add vehicle information to the response
-                response["detected_vehicles"].append({
+                # Extract the frame of the detected vehicle, it is classified together with the rest of the frame's
+                # vehicles if the policy allows it and the track is new or the re-classification policy asks for it
+                x1, y1, x2, y2 = crop_boxes[i]
+                vehicle_frame = frame[y1:y2, x1:x2]
+                # The cached attributes of a tracked vehicle are kept while it is not eligible
+                self.attribute_cache.touch(track_id, self.frame_index)
+                if eligible[i] and vehicle_frame.size > 0 and \
+                        self.attribute_cache.needs_classification(track_id, self.frame_index, areas[i]):
+                    classification_candidates.append(i)
+                    vehicle_frames_by_index[i] = vehicle_frame
+
+                # Add vehicle information to the response, with the speed and reliability read from the
+                # incremental estimator of the track
+                vehicle_info = self._vehicle_info(track_id, label, conf, x, y, w, h, frame_timestamp, track["speed"],
+                                                  directions[i], direction_labels[i])
+                # Remember the detection, to move it on the frames the detector skips
+                self.last_detections.append({
                     "vehicle_id": track_id,
                     "vehicle_type": label,
-                    "detection_confidence": conf.item(),
-                    "vehicle_coordinates": {
-                        "x": x.item(),
-                        "y": y.item(), 
-                        "width": w.item(), 
-                        "height": h.item()
-                    },
-                    "vehicle_frame_base64": vehicle_frame_base64,
-                    "vehicle_frame_timestamp": frame_timestamp, 
-                    "color_info": color_info_json,
-                    "model_info": model_info_json,
-                    "speed_info": {
-                        "kph": speed_kph, 
-                        "reliability": reliability,
-                        "direction_label": direction_label,
-                        "direction": direction
-                    }
+                    "cls": cls,
+                    "detection_confidence": conf,
+                    "coordinates": coordinates[i],
+                    "time": frame_time,
+                    "track": track,
+                    "eligible": eligible[i]
                 })
-                    
-            annotated_frame_base64 = self._encode_image_base64(annotated_frame)
-            response["annotated_frame_base64"] = annotated_frame_base64
+                if include_crops and (eligible[i] or not self.classification_policy.crop_eligible_only):
+                    self._set_response_image(vehicle_info, "vehicle_frame", vehicle_frame, crop_format)
+                response["detected_vehicles"].append(vehicle_info)
+
+            # Classify the vehicle crops selected within the budget of the frame with both classifiers in a single
+            # session call, the other candidates stay pending until the next frames
+            selected = self.classification_policy.select(classification_candidates, areas)
+            color_infos, model_infos = [], []
+            if selected:
+                from VehicleDetectionTracker.classifier_core import predict_batch_joint
+                self._initialize_classifiers()
+                color_infos, model_infos = predict_batch_joint([vehicle_frames_by_index[i] for i in selected],
+                                                               self.color_classifier, self.model_classifier)
+            for i, color_info, model_info in zip(selected, color_infos, model_infos):
+                self.attribute_cache.update(track_ids[i], self.frame_index, areas[i], color_info, model_info)
+            self._fill_attributes(response["detected_vehicles"])
+
+            if annotated_frame is not None:
+                self._set_response_image(response, "annotated_frame", annotated_frame, frame_format)
+
+        # Forget the state and the classifications of the tracks that are too old or that ByteTrack has dropped
+        evicted = self.track_state.evict(self.frame_index)
+        self.detected_vehicles.difference_update(evicted)
+        self.attribute_cache.evict(self.frame_index)
+
+        # Encode the original frame, only if it has been requested
+        if include_original:
+            self._set_response_image(response, "original_frame", frame, frame_format)
+
+        return response
+
+    def get_state_stats(self):
+        """
+        Report the size of the tracking state and how many tracks have been evicted from it.
+
+        Returns:
+            dict: Number of tracked vehicles, of cached classifications and of evicted tracks and classifications.
+        """
+        return {
+            "tracked_vehicles": len(self.track_state),
+            "cached_classifications": len(self.attribute_cache),
+            "evicted_tracks": self.track_state.evicted_count,
+            "evicted_classifications": self.attribute_cache.evicted_count,
+            "frame_stride": self.frame_stride.stats() if self.frame_stride is not None else None,
+            "motion_gate": dict(self.motion_gate.stats) if self.motion_gate is not None else None
+        }
+
+    def encode_response_images(self, response, crop_format="base64", frame_format="base64"):
+        """
+        Encode the ndarray images of a response returned by process_frame with crop_format and frame_format "ndarray".
 
-        # Encode the original frame as base64
-        original_frame_base64 = self._encode_image_base64(frame)
-        response["original_frame_base64"] = original_frame_base64
+        Args:
+            response (dict): Response of process_frame, updated in place.
+            crop_format (str): Format of the vehicle crops, one of IMAGE_FORMATS.
+            frame_format (str): Format of the original and annotated frames, one of IMAGE_FORMATS.
 
+        Returns:
+            dict: The updated response.
+        """
+        for key in ("annotated_frame", "original_frame"):
+            image = response.pop(key, None)
+            if image is not None:
+                self._set_response_image(response, key, image, frame_format)
+        for vehicle in response["detected_vehicles"]:
+            image = vehicle.pop("vehicle_frame", None)
+            if image is not None:
+                self._set_response_image(vehicle, "vehicle_frame", image, crop_format)
         return response
 
-    def process_video(self, video_path, result_callback):
+    def process_video(self, video_path, result_callback, headless=False):
         """
         Process a video by calling a callback for each frame's results.
 
         Args:
             video_path (str): Path to the video file.
             result_callback (function): A callback function to handle the processing results for each frame.
+            headless (bool): Do not plot nor display the annotated frame.
         """
         # Process a video frame by frame, calling a callback with the results.
         cap = cv2.VideoCapture(video_path)
+        frame_rate = int(cap.get(cv2.CAP_PROP_FPS))
+        print(f"Frame rate: {frame_rate} FPS")
 
         while cap.isOpened():
             success, frame = cap.read()
             if success:
-                frame_rate = int(cap.get(cv2.CAP_PROP_FPS))
-                print(f"Frame rate: {frame_rate} FPS")
                 timestamp = datetime.now()
-                response = self.process_frame(frame, timestamp)
-                if 'annotated_frame_base64' in response:
-                    annotated_frame = self._decode_image_base64(response['annotated_frame_base64'])
-                    if annotated_frame is not None:
-                        # Display the annotated frame in a window
-                        cv2.imshow("Video Detection Tracker - YOLOv8 + bytetrack", annotated_frame)
-                # Call the callback with the response
-                result_callback(response)
+                response = self.process_frame(frame, timestamp, include_annotated=not headless,
+                                              crop_format="ndarray", frame_format="ndarray")
+                annotated_frame = response.get("annotated_frame")
+                if annotated_frame is not None:
+                    # Display the annotated frame in a window
+                    cv2.imshow("Video Detection Tracker - YOLOv8 + bytetrack", annotated_frame)
+                # Call the callback with the response, with its images encoded as base64
+                result_callback(self.encode_response_images(response))
                 # Break the loop if 'q' is pressed
-                if cv2.waitKey(1) & 0xFF == ord("q"):
+                if not headless and cv2.waitKey(1) & 0xFF == ord("q"):
                     break
             else:
                 # Break the loop if the end of the video is reached
@@ -306,4 +632,28 @@ class VehicleDetectionTracker:
 
         # Release the video capture object and close the display window
         cap.release()
-        cv2.destroyAllWindows()
+        if not headless:
+            cv2.destroyAllWindows()
+
+    def process_video_pipelined(self, video_path, result_callback, queue_size=8, backpressure="block", headless=False,
+                                **response_options):
+        """
+        Process a video with a decode -> infer -> publish pipeline, calling a callback for each frame's results.
+
+        Frames are read on a capture thread and processed on an inference thread, while images are encoded,
+        displayed and handed to the callback on the calling thread.
+
+        Args:
+            video_path (str): Path to the video file.
+            result_callback (function): A callback function to handle the processing results for each frame.
+            queue_size (int): Maximum number of frames waiting between two stages.
+            backpressure (str): "block", "drop_oldest" or "drop_newest", what to do when the frame queue is full.
+            headless (bool): Do not plot nor display the annotated frame.
+            **response_options: Options of the responses (include_original, include_crops, crop_format and frame_format).
+
+        Returns:
+            dict: Number of frames read, dropped by the backpressure policy and processed.
+        """
+        pipeline = VideoPipeline(self, queue_size=queue_size, backpressure=backpressure, headless=headless,
+                                 **response_options)
+        return pipeline.run(video_path, result_callback)
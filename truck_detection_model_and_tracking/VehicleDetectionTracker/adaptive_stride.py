@@ -0,0 +1,90 @@
+import math
+
+
+class AdaptiveStride:
+
+    def __init__(self, min_stride=1, max_stride=6, target_latency=None, max_displacement=None, smoothing=0.2):
+        """
+        Initialize the controller deciding on which frames the detector runs.
+
+        The detector runs every stride frames; on the frames in between, the tracks of the last detection are
+        moved with their motion model. The stride is max_stride, reduced so that:
+            - the mean processing time per frame stays below target_latency, from the measured times of the
+              detection frames and of the skipped frames,
+            - the fastest track does not move more than max_displacement pixels between two detections.
+
+        Args:
+            min_stride (int): Minimum stride, 1 to allow running the detector on every frame.
+            max_stride (int): Maximum stride, e.g. 6 to detect at 5 fps on a 30 fps camera.
+            target_latency (float, optional): Mean processing time per frame to hold, in seconds. A CPU budget
+                is expressed as a share of the frame interval, e.g. 0.5 / fps for half a core.
+            max_displacement (float, optional): Maximum distance in pixels a track may move between two detections.
+            smoothing (float): Weight of the newest measurement in the moving averages of the processing times.
+        """
+        if not 1 <= min_stride <= max_stride:
+            raise ValueError("Strides must satisfy 1 <= min_stride <= max_stride")
+        self.min_stride = min_stride
+        self.max_stride = max_stride
+        self.target_latency = target_latency
+        self.max_displacement = max_displacement
+        self.smoothing = smoothing
+        self.stride = min_stride if target_latency is not None else max_stride
+        self.frames_since_detection = None  # None until the first detection
+        self.detection_time = None  # Moving average of the processing time of the detection frames, in seconds
+        self.propagation_time = None  # Moving average of the processing time of the skipped frames, in seconds
+        self.motion = 0.0  # Displacement of the fastest track between two consecutive frames, in pixels
+
+    def should_detect(self):
+        """
+        Returns:
+            bool: True if the detector has to run on the next frame.
+        """
+        return self.frames_since_detection is None or self.frames_since_detection + 1 >= self.stride
+
+    def _average(self, average, value):
+        return value if average is None else average + self.smoothing * (value - average)
+
+    def update(self, detected, elapsed, motion=None):
+        """
+        Record the processing of a frame and adjust the stride.
+
+        Args:
+            detected (bool): Whether the detector ran on the frame.
+            elapsed (float): Processing time of the frame, in seconds.
+            motion (float, optional): Displacement of the fastest track between two consecutive frames, in pixels,
+                measured on detection frames.
+        """
+        if detected:
+            self.frames_since_detection = 0
+            self.detection_time = self._average(self.detection_time, elapsed)
+            if motion is not None:
+                self.motion = motion
+        else:
+            self.frames_since_detection += 1
+            self.propagation_time = self._average(self.propagation_time, elapsed)
+        self.stride = self._compute_stride()
+
+    def _compute_stride(self):
+        stride = self.max_stride
+        if self.target_latency is not None and self.detection_time is not None:
+            # Over a cycle of N frames, the mean time per frame is (detection + (N - 1) * propagation) / N
+            propagation_time = self.propagation_time or 0.0
+            if self.detection_time <= self.target_latency:
+                stride = self.min_stride
+            elif self.target_latency > propagation_time:
+                stride = math.ceil((self.detection_time - propagation_time) / (self.target_latency - propagation_time))
+        if self.max_displacement is not None and self.motion > 0:
+            stride = min(stride, math.floor(self.max_displacement / self.motion))
+        return max(self.min_stride, min(self.max_stride, stride))
+
+    def stats(self):
+        """
+        Returns:
+            dict: Current stride, measured processing times and motion.
+        """
+        return {
+            "stride": self.stride,
+            "detection_time": self.detection_time,
+            "propagation_time": self.propagation_time,
+            "motion": self.motion
+        }
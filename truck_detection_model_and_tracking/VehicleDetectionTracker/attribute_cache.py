@@ -0,0 +1,122 @@
+import json
+
+
+class TrackAttributeCache:
+
+    def __init__(self, reclassify_every_n_frames=None, reclassify_area_growth=1.5, reclassify_min_confidence=None, max_missing_frames=30):
+        """
+        Initialize the cache of color and model classifications, keyed by track ID.
+
+        A track is classified when it first appears and re-classified only when the policy asks for it.
+
+        Args:
+            reclassify_every_n_frames (int or None): Re-classify a track every N frames. None disables it.
+            reclassify_area_growth (float or None): Re-classify a track when its box area grows by this factor
+                since its last classification. None disables it.
+            reclassify_min_confidence (float or None): Re-classify a track while the top probability of
+                any of its classifications is below this value. None disables it.
+            max_missing_frames (int): Number of frames a track may be missing before its entry is evicted.
+                It matches the default track_buffer of ByteTrack, after which the tracker drops the ID.
+        """
+        self.reclassify_every_n_frames = reclassify_every_n_frames
+        self.reclassify_area_growth = reclassify_area_growth
+        self.reclassify_min_confidence = reclassify_min_confidence
+        self.max_missing_frames = max_missing_frames
+        self.entries = {}
+        self.evicted_count = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, track_id):
+        return track_id in self.entries
+
+    def touch(self, track_id, frame_index):
+        """
+        Record that a track is still seen, so that its entry is kept while the tracker holds its ID, even on the
+        frames it is not eligible for classification.
+
+        Args:
+            track_id (int): ID of the track.
+            frame_index (int): Index of the current frame.
+        """
+        entry = self.entries.get(track_id)
+        if entry is not None:
+            entry["last_seen"] = frame_index
+
+    def needs_classification(self, track_id, frame_index, area):
+        """
+        Decide whether a track has to be (re-)classified in this frame.
+
+        Args:
+            track_id (int): ID of the track.
+            frame_index (int): Index of the current frame.
+            area (float): Area of the track's bounding box in this frame.
+
+        Returns:
+            bool: True if the classifiers have to run for this track.
+        """
+        entry = self.entries.get(track_id)
+        if entry is None:
+            return True
+        entry["last_seen"] = frame_index
+        if self.reclassify_every_n_frames is not None and \
+                frame_index - entry["classified_at"] >= self.reclassify_every_n_frames:
+            return True
+        if self.reclassify_area_growth is not None and entry["area"] > 0 and \
+                area / entry["area"] >= self.reclassify_area_growth:
+            return True
+        if self.reclassify_min_confidence is not None and \
+                entry["confidence"] < self.reclassify_min_confidence:
+            return True
+        return False
+
+    def update(self, track_id, frame_index, area, color_info, model_info):
+        """
+        Store the classification results of a track.
+
+        Args:
+            track_id (int): ID of the track.
+            frame_index (int): Index of the frame the track was classified in.
+            area (float): Area of the track's bounding box when it was classified.
+            color_info (list): Top colors returned by the color classifier.
+            model_info (list): Top makes and models returned by the model classifier.
+        """
+        confidences = [float(info[0]["prob"]) for info in (color_info, model_info) if info]
+        self.entries[track_id] = {
+            "color_info": json.dumps(color_info),
+            "model_info": json.dumps(model_info),
+            "confidence": min(confidences) if confidences else 0.0,
+            "area": area,
+            "classified_at": frame_index,
+            "last_seen": frame_index
+        }
+
+    def get(self, track_id):
+        """
+        Get the cached classification of a track.
+
+        Args:
+            track_id (int): ID of the track.
+
+        Returns:
+            dict or None: Cached "color_info" and "model_info" JSON strings, or None if the track is unknown.
+        """
+        return self.entries.get(track_id)
+
+    def evict(self, frame_index):
+        """
+        Evict the tracks that have not been seen for more than max_missing_frames frames.
+
+        Args:
+            frame_index (int): Index of the current frame.
+
+        Returns:
+            list: IDs of the evicted tracks.
+        """
+        evicted = [track_id for track_id, entry in self.entries.items()
+                   if frame_index - entry["last_seen"] > self.max_missing_frames]
+        for track_id in evicted:
+            del self.entries[track_id]
+        self.evicted_count += len(evicted)
+        return evicted
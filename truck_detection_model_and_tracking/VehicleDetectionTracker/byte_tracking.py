@@ -0,0 +1,48 @@
+# Confidence threshold of YOLO.track, low enough for the second association of ByteTrack with low score boxes.
+# smart_yard_common.tiling keeps a copy for the TiledDetector, checked by tests/test_byte_tracking.py
+TRACKING_CONFIDENCE = 0.1
+
+
+def create_byte_tracker(tracker_config="bytetrack.yaml", frame_rate=30):
+    """
+    Create a ByteTrack tracker holding the tracking state of a single stream.
+
+    Args:
+        tracker_config (str): ByteTrack configuration file.
+        frame_rate (int): Frame rate of the stream, used by ByteTrack to size its track buffer.
+
+    Returns:
+        BYTETracker: The tracker.
+    """
+    from ultralytics.trackers.byte_tracker import BYTETracker
+    from ultralytics.utils import IterableSimpleNamespace, yaml_load
+    from ultralytics.utils.checks import check_yaml
+    tracker_args = IterableSimpleNamespace(**yaml_load(check_yaml(tracker_config)))
+    return BYTETracker(args=tracker_args, frame_rate=frame_rate)
+
+
+def update_tracks(result, byte_tracker, frame):
+    """
+    Associate the detections of a frame with the tracks of a ByteTrack tracker.
+
+    Same as the on_predict_postprocess_end callback of ultralytics, with a tracker owned by the caller.
+
+    Args:
+        result (Results): Detections of the frame, as returned by YOLO.predict.
+        byte_tracker (BYTETracker): Tracking state of the stream.
+        frame (numpy.ndarray): The frame.
+
+    Returns:
+        Results: The tracked detections, with their track IDs.
+    """
+    import torch
+    det = result.boxes.cpu().numpy()
+    if len(det) == 0:
+        return result
+    tracks = byte_tracker.update(det, frame)
+    if len(tracks) == 0:
+        return result[[]]
+    idx = tracks[:, -1].astype(int)
+    result = result[idx]
+    result.update(boxes=torch.as_tensor(tracks[:, :-1]))
+    return result
@@ -0,0 +1,97 @@
+import numpy as np
+
+
+def points_in_polygon(points, polygon):
+    """
+    Test which points lie inside a polygon, with the even-odd rule.
+
+    Args:
+        points (numpy.ndarray): (N, 2) array of x, y coordinates.
+        polygon (numpy.ndarray): (M, 2) array of the vertices of the polygon.
+
+    Returns:
+        numpy.ndarray: (N,) boolean array.
+    """
+    x, y = points[:, 0:1], points[:, 1:2]
+    x1, y1 = polygon[:, 0], polygon[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    # Count the edges crossed by a horizontal ray going right from each point
+    straddles = (y1 > y) != (y2 > y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        crossing_x = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    crossings = straddles & (x < crossing_x)
+    return np.count_nonzero(crossings, axis=1) % 2 == 1
+
+
+class ClassificationPolicy:
+
+    def __init__(self, class_names=None, min_area=None, min_confidence=None, roi=None, max_per_frame=None,
+                 crop_eligible_only=True):
+        """
+        Initialize the policy deciding which detections are classified, and cropped and encoded in the responses.
+
+        A detection is eligible when it passes every filter that is set. Among the eligible detections that the
+        attribute cache asks to (re-)classify, at most max_per_frame are classified per frame, largest boxes first;
+        the others stay pending and are classified in the next frames.
+
+        Subclasses can override eligible and select to implement other policies.
+
+        Args:
+            class_names (iterable of str, optional): Classes to classify, e.g. ["truck"]. All classes if omitted.
+            min_area (float, optional): Minimum area of the bounding box, in pixels.
+            min_confidence (float, optional): Minimum detection confidence.
+            roi (list, optional): Region of interest, as a rectangle (x1, y1, x2, y2) or a polygon [(x, y), ...].
+                A detection is inside the region when the center of its box is.
+            max_per_frame (int, optional): Maximum number of detections classified per frame.
+            crop_eligible_only (bool): Only crop and encode the eligible detections in the responses.
+        """
+        self.class_names = set(class_names) if class_names is not None else None
+        self.min_area = min_area
+        self.min_confidence = min_confidence
+        self.roi = None
+        if roi is not None:
+            roi = np.asarray(roi, dtype=np.float64)
+            if roi.shape == (4,):
+                x1, y1, x2, y2 = roi
+                roi = np.array([[x1, y1], [x2, y1], [x2, y2], [x1, y2]])
+            self.roi = roi.reshape((-1, 2))
+        self.max_per_frame = max_per_frame
+        self.crop_eligible_only = crop_eligible_only
+
+    def eligible(self, class_names, confidences, boxes):
+        """
+        Decide which detections of a frame may be classified.
+
+        Args:
+            class_names (list): Class name of every detection.
+            confidences (numpy.ndarray): Detection confidence of every detection.
+            boxes (numpy.ndarray): (N, 4) bounding boxes in xywh format.
+
+        Returns:
+            numpy.ndarray: (N,) boolean array, True for the eligible detections.
+        """
+        mask = np.ones(len(boxes), dtype=bool)
+        if self.class_names is not None:
+            mask &= np.array([name in self.class_names for name in class_names], dtype=bool)
+        if self.min_area is not None:
+            mask &= boxes[:, 2] * boxes[:, 3] >= self.min_area
+        if self.min_confidence is not None:
+            mask &= np.asarray(confidences) >= self.min_confidence
+        if self.roi is not None:
+            mask &= points_in_polygon(boxes[:, :2], self.roi)
+        return mask
+
+    def select(self, candidates, areas):
+        """
+        Apply the per-frame budget to the detections that need to be classified.
+
+        Args:
+            candidates (list): Indices of the eligible detections that need to be classified.
+            areas (list): Box area of every detection of the frame.
+
+        Returns:
+            list: Indices of the detections to classify in this frame.
+        """
+        if self.max_per_frame is None or len(candidates) <= self.max_per_frame:
+            return candidates
+        return sorted(candidates, key=lambda i: areas[i], reverse=True)[:self.max_per_frame]
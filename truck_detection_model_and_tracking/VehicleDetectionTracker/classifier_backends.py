@@ -0,0 +1,118 @@
+import os
+import threading
+
+# Backends able to run the classifiers. "tensorflow" runs the original frozen graphs, the other ones run the
+# models produced by VehicleDetectionTracker.convert_classifiers.
+BACKENDS = ("tensorflow", "onnxruntime", "openvino")
+
+# Environment variable overriding the backend set in the config of the classifiers
+BACKEND_ENV_VAR = "VEHICLE_CLASSIFIER_BACKEND"
+
+
+def get_backend_name(default="tensorflow"):
+    """
+    Returns:
+        str: The backend set by the VEHICLE_CLASSIFIER_BACKEND environment variable, or default if it is not set.
+    """
+    backend = os.environ.get(BACKEND_ENV_VAR, default).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown classifier backend {backend}, expected one of {BACKENDS}")
+    return backend
+
+
+class TensorFlowBackend:
+
+    def __init__(self, registry, model_file, input_layer, output_layer):
+        """
+        Run a frozen graph of the model registry with Tensorflow.
+
+        Args:
+            registry (ModelRegistry): Registry the graph is imported into.
+            model_file (str): Path to the frozen graph.
+            input_layer (str): Name of the input operation.
+            output_layer (str): Name of the output operation.
+        """
+        self.registry = registry
+        self.input_operation, self.output_operation = registry.get_model(model_file, input_layer, output_layer)
+        self.sess = registry.get_session()
+
+    def run(self, batch):
+        return self.sess.run(self.output_operation.outputs[0], {self.input_operation.outputs[0]: batch})
+
+
+class OnnxRuntimeBackend:
+
+    def __init__(self, model_file, intra_op_threads=None):
+        """
+        Run an ONNX model with the CPU execution provider of ONNX Runtime.
+
+        Args:
+            model_file (str): Path to the .onnx model.
+            intra_op_threads (int, optional): Threads used inside an operation, defaults to the ONNX Runtime default.
+        """
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads is not None:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(model_file, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.output_name = self.session.get_outputs()[0].name
+
+    def run(self, batch):
+        return self.session.run([self.output_name], {self.input_name: batch})[0]
+
+
+class OpenVinoBackend:
+
+    def __init__(self, model_file, device="CPU", num_threads=None):
+        """
+        Run an OpenVINO IR (.xml) or ONNX model with the OpenVINO runtime.
+
+        Args:
+            model_file (str): Path to the .xml or .onnx model.
+            device (str): OpenVINO device the model is compiled for.
+            num_threads (int, optional): Threads used by the inference, defaults to the OpenVINO default.
+        """
+        import openvino as ov
+        config = {"PERFORMANCE_HINT": "LATENCY"}
+        if num_threads is not None:
+            config["INFERENCE_NUM_THREADS"] = num_threads
+        self.compiled_model = ov.Core().compile_model(model_file, device, config)
+        self.output = self.compiled_model.output(0)
+        self._lock = threading.Lock()
+
+    def run(self, batch):
+        # The inference request of a compiled model must not be shared by concurrent calls
+        with self._lock:
+            return self.compiled_model(batch)[self.output]
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+def get_runtime_backend(backend, model_file, num_threads=None):
+    """
+    Get the ONNX Runtime or OpenVINO backend of a model, created once and shared by every classifier of the process.
+
+    Args:
+        backend (str): "onnxruntime" or "openvino".
+        model_file (str): Path to the converted model.
+        num_threads (int, optional): Threads used by the inference.
+
+    Returns:
+        OnnxRuntimeBackend or OpenVinoBackend: The backend.
+    """
+    if not os.path.exists(model_file):
+        target = "onnx" if backend == "onnxruntime" else backend
+        raise FileNotFoundError(f"{model_file} not found, convert the classifiers with vehicle-classifier-convert --to {target}")
+    with _backends_lock:
+        key = (backend, model_file)
+        if key not in _backends:
+            if backend == "onnxruntime":
+                _backends[key] = OnnxRuntimeBackend(model_file, num_threads)
+            elif backend == "openvino":
+                _backends[key] = OpenVinoBackend(model_file, num_threads=num_threads)
+            else:
+                raise ValueError(f"Unknown classifier backend {backend}, expected one of {BACKENDS}")
+        return _backends[key]
@@ -0,0 +1,298 @@
+# Copyright © 2019 by Spectrico
+# Licensed under the MIT License
+
+import os
+import threading
+import numpy as np
+import cv2
+from VehicleDetectionTracker.classifier_backends import TensorFlowBackend, get_backend_name, get_runtime_backend
+
+def _tf():
+    # Tensorflow is only imported by the tensorflow backend, the other backends do not need it
+    import tensorflow.compat.v1 as tf
+    return tf
+
+def load_graph_def(model_file):
+    tf = _tf()
+    graph_def = tf.GraphDef()
+    with open(model_file, "rb") as f:
+        graph_def.ParseFromString(f.read())
+    return graph_def
+
+def load_labels(label_file):
+    label = []
+    with open(label_file, "r", encoding='cp1251') as ins:
+        for line in ins:
+            label.append(line.rstrip())
+
+    return label
+
+def letterbox_into(img, out, interpolation="cubic", padColor=0):
+    """
+    Letterbox a BGR crop into a slot of a float32 batch, as RGB scaled to [-1, 1] with the normalization of the
+    classifiers, without allocating the padded or float32 intermediate images.
+
+    Args:
+        img (numpy.ndarray): BGR crop.
+        out (numpy.ndarray): Float32 (height, width, 3) slot of the batch, overwritten.
+        interpolation (str): "cubic" resizes as in training, with INTER_AREA to shrink and INTER_CUBIC to
+            stretch. "linear" uses INTER_LINEAR, which is faster.
+        padColor (int): Color of the padding, before normalization.
+    """
+    h, w = img.shape[:2]
+    sh, sw = out.shape[:2]
+
+    # interpolation method
+    if interpolation == "linear":
+        interp = cv2.INTER_LINEAR
+    elif h > sh or w > sw: # shrinking image
+        interp = cv2.INTER_AREA
+    else: # stretching image
+        interp = cv2.INTER_CUBIC
+
+    # compute scaling and pad sizing, centering the crop
+    aspect = w/h
+    if aspect > 1: # horizontal image
+        new_w, new_h = sw, max(1, int(round(sw/aspect)))
+    elif aspect < 1: # vertical image
+        new_w, new_h = max(1, int(round(sh*aspect))), sh
+    else: # square image
+        new_w, new_h = sw, sh
+    top, left = (sh-new_h)//2, (sw-new_w)//2
+
+    # swap the resized crop to RGB in place, then scale it straight into its place in the batch
+    region = out[top:top+new_h, left:left+new_w]
+    scaled_img = cv2.resize(img, (new_w, new_h), interpolation=interp)
+    cv2.cvtColor(scaled_img, cv2.COLOR_BGR2RGB, dst=scaled_img)
+    np.divide(scaled_img, 127.5, out=region, dtype=np.float32, casting="unsafe")
+    region -= 1.
+
+    # fill the padding
+    pad = padColor/127.5 - 1.
+    out[:top] = pad
+    out[top+new_h:] = pad
+    out[top:top+new_h, :left] = pad
+    out[top:top+new_h, left+new_w:] = pad
+
+
+class ModelRegistry():
+
+    def __init__(self, intra_op_threads=None, inter_op_threads=None):
+        """
+        Registry of the frozen classifier graphs, each loaded once and shared by every classifier of the process.
+
+        All the graphs are imported into a single graph run by a single session with explicit thread pools,
+        so several classifiers can be evaluated with one session call and do not oversubscribe the cores.
+
+        Args:
+            intra_op_threads (int, optional): Threads used inside an operation. Defaults to half of the cores.
+            inter_op_threads (int, optional): Operations run in parallel. Defaults to 2, one per classifier.
+        """
+        cpu_count = os.cpu_count() or 1
+        self.intra_op_threads = intra_op_threads if intra_op_threads is not None else max(1, cpu_count // 2)
+        self.inter_op_threads = inter_op_threads if inter_op_threads is not None else 2
+        self.graph = None
+        self.sess = None
+        self.models = {}
+        self.labels = {}
+        self._lock = threading.Lock()
+
+    def get_model(self, model_file, input_layer, output_layer):
+        """
+        Get the input and output operations of a frozen graph, importing it the first time it is requested.
+
+        Returns:
+            tuple: (input_operation, output_operation) of the graph.
+        """
+        with self._lock:
+            tf = _tf()
+            if self.graph is None:
+                self.graph = tf.Graph()
+            key = (model_file, input_layer, output_layer)
+            if key not in self.models:
+                scope = "model_{}".format(len(self.models))
+                with self.graph.as_default():
+                    tf.import_graph_def(load_graph_def(model_file), name=scope)
+                self.models[key] = (self.graph.get_operation_by_name(scope + "/" + input_layer),
+                                    self.graph.get_operation_by_name(scope + "/" + output_layer))
+            return self.models[key]
+
+    def get_labels(self, label_file):
+        with self._lock:
+            if label_file not in self.labels:
+                self.labels[label_file] = load_labels(label_file)
+            return self.labels[label_file]
+
+    def get_session(self):
+        with self._lock:
+            if self.sess is None:
+                tf = _tf()
+                config = tf.ConfigProto(intra_op_parallelism_threads=self.intra_op_threads,
+                                        inter_op_parallelism_threads=self.inter_op_threads)
+                self.sess = tf.Session(graph=self.graph, config=config)
+            return self.sess
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def configure_registry(intra_op_threads=None, inter_op_threads=None):
+    """
+    Set the thread pools of the process-wide registry. Must be called before the first classifier is used.
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is not None and _registry.sess is not None:
+            raise RuntimeError("The model registry is already in use")
+        _registry = ModelRegistry(intra_op_threads, inter_op_threads)
+        return _registry
+
+def get_registry():
+    """
+    Returns:
+        ModelRegistry: The process-wide registry, created with the default thread pools on first use.
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
+
+
+class BaseClassifier():
+    # Set by the subclasses from their config module
+    model_file = None
+    label_file = None
+    input_layer = None
+    output_layer = None
+    classifier_input_size = None
+    backend_name = "tensorflow"
+    onnx_model_file = None
+    int8_onnx_model_file = None
+    openvino_model_file = None
+    quantized = False
+    resize_interpolation = "cubic"
+
+    def __init__(self, registry=None, backend=None, quantized=None):
+        """
+        Args:
+            registry (ModelRegistry, optional): Registry of the models, defaults to the process-wide registry.
+            backend (str, optional): "tensorflow", "onnxruntime" or "openvino". Defaults to the
+                VEHICLE_CLASSIFIER_BACKEND environment variable, then to the backend set in the config, or to
+                "onnxruntime" when quantized.
+            quantized (bool, optional): Run the INT8 model with the onnxruntime backend. Defaults to the config.
+
+        Raises:
+            ValueError: If quantized is set with another backend than onnxruntime.
+        """
+        # uncomment the next 3 lines if you want to use CPU instead of GPU
+        os.environ["CUDA_DEVICE_ORDER"] = "PCI_BUS_ID"
+        os.environ['CUDA_VISIBLE_DEVICES'] = '-1'
+
+        self.registry = registry
+        if quantized is not None:
+            self.quantized = quantized
+        # The INT8 model only exists in ONNX, so quantization selects the onnxruntime backend
+        default_backend = "onnxruntime" if self.quantized else self.backend_name
+        self.backend_name = backend if backend is not None else get_backend_name(default_backend)
+        if self.quantized and self.backend_name != "onnxruntime":
+            raise ValueError(f"The quantized classifier requires the onnxruntime backend, got {self.backend_name}")
+        self.backend = None
+        self.labels = None
+        self._batch_buffer = None
+
+    def initialize(self):
+        if self.registry is None:
+            self.registry = get_registry()
+        self.labels = self.registry.get_labels(self.label_file)
+        if self.backend_name == "tensorflow":
+            self.backend = TensorFlowBackend(self.registry, self.model_file, self.input_layer, self.output_layer)
+        elif self.backend_name == "onnxruntime":
+            model_file = self.int8_onnx_model_file if self.quantized else self.onnx_model_file
+            self.backend = get_runtime_backend("onnxruntime", model_file, self.registry.intra_op_threads)
+        else:
+            self.backend = get_runtime_backend(self.backend_name, self.openvino_model_file, self.registry.intra_op_threads)
+
+    def format_class(self, label, prob):
+        raise NotImplementedError
+
+    def preprocess_batch(self, crops):
+        """
+        Letterbox the crops into the reusable batch buffer of the classifier, scaled to the range used in the
+        trained network.
+
+        The buffer only grows, so steady-state batches allocate nothing but the resized crops. The returned batch
+        is a view on the buffer that the next call overwrites, so a classifier must not be shared by threads.
+
+        Args:
+            crops (list): BGR vehicle crops as numpy arrays.
+
+        Returns:
+            numpy.ndarray: Float32 batch of shape (len(crops), height, width, 3).
+        """
+        height, width = self.classifier_input_size
+        if self._batch_buffer is None or len(self._batch_buffer) < len(crops):
+            # Round the capacity up to a power of two so that growing batches do not reallocate every time
+            capacity = 1 << max(0, len(crops) - 1).bit_length()
+            self._batch_buffer = np.empty((capacity, height, width, 3), dtype=np.float32)
+        batch = self._batch_buffer[:len(crops)]
+        for img, out in zip(crops, batch):
+            letterbox_into(img, out, self.resize_interpolation)
+        return batch
+
+    def format_predictions(self, results, count):
+        results = np.reshape(results, (count, -1))
+        top = 3
+        predictions = []
+        for probs in results:
+            top_indices = probs.argsort()[-top:][::-1]
+            predictions.append([self.format_class(self.labels[ix], probs[ix]) for ix in top_indices])
+        return predictions
+
+    def predict(self, img):
+        return self.predict_batch([img])[0]
+
+    def predict_batch(self, crops):
+        """
+        Classify several vehicle crops with a single inference call.
+
+        Args:
+            crops (list): BGR vehicle crops as numpy arrays.
+
+        Returns:
+            list: For each crop, the top 3 classes with their probabilities.
+        """
+        if len(crops) == 0:
+            return []
+        if self.backend is None:
+            self.initialize()
+
+        results = self.backend.run(self.preprocess_batch(crops))
+        return self.format_predictions(results, len(crops))
+
+
+def predict_batch_joint(crops, *classifiers):
+    """
+    Classify the same vehicle crops with several classifiers, with a single session call when they all run with
+    the Tensorflow backend of the same registry.
+
+    Args:
+        crops (list): BGR vehicle crops as numpy arrays.
+        *classifiers (BaseClassifier): Classifiers to run.
+
+    Returns:
+        list: For each classifier, its predictions for every crop, as returned by predict_batch.
+    """
+    if len(crops) == 0:
+        return [[] for _ in classifiers]
+    for classifier in classifiers:
+        if classifier.backend is None:
+            classifier.initialize()
+    backends = [classifier.backend for classifier in classifiers]
+    if not all(isinstance(backend, TensorFlowBackend) for backend in backends) or len({id(backend.registry) for backend in backends}) > 1:
+        return [classifier.predict_batch(crops) for classifier in classifiers]
+
+    fetches = [backend.output_operation.outputs[0] for backend in backends]
+    feed_dict = {backend.input_operation.outputs[0]: classifier.preprocess_batch(crops) for classifier, backend in zip(classifiers, backends)}
+    results = backends[0].sess.run(fetches, feed_dict)
+    return [classifier.format_predictions(result, len(crops)) for classifier, result in zip(classifiers, results)]
@@ -1,9 +1,15 @@
 # Copyright © 2019 by Spectrico
 # Licensed under the MIT License
-import pkg_resources
+from VehicleDetectionTracker.resources import resource_filename
 
-model_file = pkg_resources.resource_filename('VehicleDetectionTracker', 'data/model-weights-spectrico-car-colors-mobilenet-224x224-052EAC82.pb')  # path to the car color classifier
-label_file = pkg_resources.resource_filename('VehicleDetectionTracker', "data/color_labels.txt")   # path to the text file, containing list with the supported makes and models
+model_file = resource_filename('VehicleDetectionTracker', 'data/model-weights-spectrico-car-colors-mobilenet-224x224-052EAC82.pb')  # path to the car color classifier
+label_file = resource_filename('VehicleDetectionTracker', "data/color_labels.txt")   # path to the text file, containing list with the supported makes and models
 input_layer = "input_1"
 output_layer = "softmax/Softmax"
-classifier_input_size = (224, 224) # input size of the classifier
\ No newline at end of file
+classifier_input_size = (224, 224) # input size of the classifier
+backend = "tensorflow"  # "tensorflow", "onnxruntime" or "openvino", overridden by the VEHICLE_CLASSIFIER_BACKEND environment variable
+onnx_model_file = resource_filename('VehicleDetectionTracker', "data/model-weights-spectrico-car-colors-mobilenet-224x224-052EAC82.onnx")  # model converted by vehicle-classifier-convert --to onnx
+openvino_model_file = resource_filename('VehicleDetectionTracker', "data/model-weights-spectrico-car-colors-mobilenet-224x224-052EAC82.xml")  # model converted by vehicle-classifier-convert --to openvino
+int8_onnx_model_file = resource_filename('VehicleDetectionTracker', "data/model-weights-spectrico-car-colors-mobilenet-224x224-052EAC82-int8.onnx")  # model quantized by vehicle-classifier-quantize
+quantized = False  # run the INT8 model instead of the FP32 one, with the onnxruntime backend
+resize_interpolation = "cubic"  # "cubic" resizes the crops as in training (INTER_AREA/INTER_CUBIC), "linear" uses the faster INTER_LINEAR
@@ -0,0 +1,124 @@
+import argparse
+import os
+import time
+import numpy as np
+
+CLASSIFIERS = ("color", "model")
+
+
+def get_classifier_class(name):
+    if name == "color":
+        from VehicleDetectionTracker.color_classifier.classifier import Classifier
+    else:
+        from VehicleDetectionTracker.model_classifier.classifier import Classifier
+    return Classifier
+
+
+def convert_to_onnx(classifier_class, output_file, opset=13):
+    """
+    Convert the frozen graph of a classifier to ONNX.
+
+    The input keeps the NHWC layout and the batch dimension stays dynamic, so the converted model is fed exactly
+    like the frozen graph.
+
+    Args:
+        classifier_class (type): Classifier class, whose config gives the graph and its layers.
+        output_file (str): Path to the .onnx model.
+        opset (int): ONNX opset of the converted model.
+
+    Returns:
+        str: Path to the .onnx model.
+    """
+    import tf2onnx
+    from VehicleDetectionTracker.classifier_core import load_graph_def
+    tf2onnx.convert.from_graph_def(load_graph_def(classifier_class.model_file),
+                                   input_names=[classifier_class.input_layer + ":0"],
+                                   output_names=[classifier_class.output_layer + ":0"],
+                                   opset=opset, output_path=output_file)
+    return output_file
+
+
+def convert_to_openvino(onnx_file, output_file, compress_to_fp16=False):
+    """
+    Convert an ONNX classifier to the OpenVINO IR format.
+
+    Args:
+        onnx_file (str): Path to the .onnx model.
+        output_file (str): Path to the .xml model, the weights are saved next to it in a .bin file.
+        compress_to_fp16 (bool): Store the weights as FP16.
+
+    Returns:
+        str: Path to the .xml model.
+    """
+    import openvino as ov
+    ov.save_model(ov.convert_model(onnx_file), output_file, compress_to_fp16=compress_to_fp16)
+    return output_file
+
+
+def compare_backends(classifier_class, backend, crops_count=16, seed=0):
+    """
+    Check that a converted classifier matches the frozen graph on random crops.
+
+    Returns:
+        dict: Maximum absolute difference of the probabilities, agreement of the top-1 classes, and the latency
+            per crop of both backends in milliseconds.
+    """
+    rng = np.random.default_rng(seed)
+    crops = [rng.integers(0, 256, (rng.integers(64, 300), rng.integers(64, 300), 3), dtype=np.uint8) for _ in range(crops_count)]
+    reference = classifier_class(backend="tensorflow")
+    converted = classifier_class(backend=backend)
+    results = {}
+    for name, classifier in (("tensorflow", reference), (backend, converted)):
+        classifier.initialize()
+        batch = classifier.preprocess_batch(crops)
+        classifier.backend.run(batch)  # Warm up
+        start = time.perf_counter()
+        results[name] = np.reshape(classifier.backend.run(batch), (crops_count, -1))
+        results[name + "_ms_per_crop"] = (time.perf_counter() - start) * 1000 / crops_count
+    return {
+        "max_abs_diff": float(np.abs(results["tensorflow"] - results[backend]).max()),
+        "top1_agreement": float(np.mean(results["tensorflow"].argmax(axis=1) == results[backend].argmax(axis=1))),
+        "tensorflow_ms_per_crop": results["tensorflow_ms_per_crop"],
+        backend + "_ms_per_crop": results[backend + "_ms_per_crop"]
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert the color and make/model classifiers to ONNX or OpenVINO.")
+    parser.add_argument("--classifier", choices=CLASSIFIERS + ("all",), default="all", help="Classifier to convert.")
+    parser.add_argument("--to", choices=("onnx", "openvino"), default="onnx", help="Target format.")
+    parser.add_argument("--output-dir", default=None, help="Directory of the converted models. Defaults to the paths "
+                        "set in the config of the classifiers, where the classifiers look for them.")
+    parser.add_argument("--opset", type=int, default=13, help="ONNX opset.")
+    parser.add_argument("--fp16", action="store_true", help="Store the OpenVINO weights as FP16.")
+    parser.add_argument("--verify", action="store_true", help="Compare the converted models with the frozen graphs.")
+    args = parser.parse_args(argv)
+
+    names = CLASSIFIERS if args.classifier == "all" else (args.classifier,)
+    for name in names:
+        classifier_class = get_classifier_class(name)
+        onnx_file = classifier_class.onnx_model_file
+        openvino_file = classifier_class.openvino_model_file
+        if args.output_dir is not None:
+            os.makedirs(args.output_dir, exist_ok=True)
+            onnx_file = os.path.join(args.output_dir, os.path.basename(onnx_file))
+            openvino_file = os.path.join(args.output_dir, os.path.basename(openvino_file))
+
+        if args.to == "onnx" or not os.path.exists(onnx_file):
+            print(f"Converting the {name} classifier to {onnx_file}")
+            convert_to_onnx(classifier_class, onnx_file, args.opset)
+        if args.to == "openvino":
+            print(f"Converting the {name} classifier to {openvino_file}")
+            convert_to_openvino(onnx_file, openvino_file, args.fp16)
+
+        if args.verify:
+            if args.output_dir is not None:
+                # The classifiers load the converted models from the paths of their config
+                classifier_class = type(classifier_class.__name__, (classifier_class,),
+                                        {"onnx_model_file": onnx_file, "openvino_model_file": openvino_file})
+            backend = "onnxruntime" if args.to == "onnx" else "openvino"
+            print(name, compare_backends(classifier_class, backend))
+
+
+if __name__ == "__main__":
+    main()
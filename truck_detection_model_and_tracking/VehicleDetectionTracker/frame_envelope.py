@@ -0,0 +1,133 @@
+import struct
+from collections import namedtuple
+from datetime import datetime
+import cv2
+import numpy as np
+
+# Binary envelope of a camera frame:
+#   magic (4s) | version (B) | encoding (B) | camera ID length (B) | reserved (B) | timestamp in epoch seconds (d)
+#   | width (H) | height (H) | payload length (I) | camera ID (UTF-8) | payload
+# The payload is a JPEG image or the raw BGR pixels of the frame, row by row.
+MAGIC = b"VDTF"
+VERSION = 1
+ENCODING_JPEG = 0
+ENCODING_BGR = 1
+HEADER = struct.Struct("!4sBBBBdHHI")
+
+FrameEnvelope = namedtuple("FrameEnvelope", ["camera_id", "frame_timestamp", "encoding", "width", "height", "payload"])
+
+
+def is_frame_envelope(data):
+    """
+    Check whether a message holds a binary frame envelope.
+
+    Args:
+        data (bytes or memoryview): Message payload.
+
+    Returns:
+        bool: True if the payload starts with the envelope magic.
+    """
+    return len(data) >= HEADER.size and bytes(data[:len(MAGIC)]) == MAGIC
+
+
+def pack_frame(camera_id, frame_timestamp, frame, encoding=ENCODING_JPEG, jpeg_quality=90):
+    """
+    Pack a frame into a binary envelope.
+
+    Args:
+        camera_id (str): ID of the camera, e.g. its MAC address.
+        frame_timestamp (datetime or float): Timestamp of the frame, or epoch seconds.
+        frame (numpy.ndarray): BGR frame.
+        encoding (int): ENCODING_JPEG to compress the frame, ENCODING_BGR to send its raw pixels.
+        jpeg_quality (int): Quality of the JPEG compression.
+
+    Returns:
+        bytes: The envelope.
+    """
+    height, width = frame.shape[:2]
+    if encoding == ENCODING_JPEG:
+        _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+        payload = buffer.tobytes()
+    elif encoding == ENCODING_BGR:
+        payload = np.ascontiguousarray(frame, dtype=np.uint8).tobytes()
+    else:
+        raise ValueError(f"Unknown frame encoding {encoding}")
+    return pack_payload(camera_id, frame_timestamp, payload, encoding, width, height)
+
+
+def pack_payload(camera_id, frame_timestamp, payload, encoding=ENCODING_JPEG, width=0, height=0):
+    """
+    Pack an already encoded payload, e.g. the JPEG produced by a camera, into a binary envelope.
+
+    Args:
+        camera_id (str): ID of the camera, e.g. its MAC address.
+        frame_timestamp (datetime or float): Timestamp of the frame, or epoch seconds.
+        payload (bytes): JPEG image or raw BGR pixels.
+        encoding (int): ENCODING_JPEG or ENCODING_BGR.
+        width (int): Width of the frame, required for ENCODING_BGR.
+        height (int): Height of the frame, required for ENCODING_BGR.
+
+    Returns:
+        bytes: The envelope.
+    """
+    camera_id = camera_id.encode("utf-8")
+    if len(camera_id) > 255:
+        raise ValueError("The camera ID must be at most 255 bytes long")
+    if hasattr(frame_timestamp, "timestamp"):
+        frame_timestamp = frame_timestamp.timestamp()
+    header = HEADER.pack(MAGIC, VERSION, encoding, len(camera_id), 0, float(frame_timestamp), width, height, len(payload))
+    return b"".join((header, camera_id, payload))
+
+
+def unpack_frame(data):
+    """
+    Unpack a binary envelope without copying its payload.
+
+    Args:
+        data (bytes, bytearray or memoryview): The envelope.
+
+    Returns:
+        FrameEnvelope: Camera ID, timestamp, encoding, size and payload of the frame. The payload is a memoryview on data.
+
+    Raises:
+        ValueError: If data is not a valid envelope.
+    """
+    view = memoryview(data)
+    if not is_frame_envelope(view):
+        raise ValueError("Not a frame envelope")
+    _, version, encoding, camera_id_length, _, timestamp, width, height, payload_length = HEADER.unpack_from(view)
+    if version != VERSION:
+        raise ValueError(f"Unsupported frame envelope version {version}")
+    camera_id_end = HEADER.size + camera_id_length
+    payload = view[camera_id_end:camera_id_end + payload_length]
+    if len(payload) != payload_length:
+        raise ValueError("Truncated frame envelope")
+    camera_id = bytes(view[HEADER.size:camera_id_end]).decode("utf-8")
+    try:
+        frame_timestamp = datetime.fromtimestamp(timestamp)
+    except (ValueError, OverflowError, OSError):
+        # NaN, or out of the range of the platform
+        raise ValueError("Invalid frame timestamp") from None
+    return FrameEnvelope(camera_id, frame_timestamp, encoding, width, height, payload)
+
+
+def decode_frame(envelope):
+    """
+    Decode the frame of an envelope.
+
+    Raw BGR payloads are wrapped without copy, so the returned frame is read-only and shares the envelope's memory.
+
+    Args:
+        envelope (FrameEnvelope): Unpacked envelope.
+
+    Returns:
+        numpy.ndarray or None: BGR frame, or None if the payload cannot be decoded.
+    """
+    pixels = np.frombuffer(envelope.payload, dtype=np.uint8)
+    if envelope.encoding == ENCODING_BGR:
+        if pixels.size != envelope.width * envelope.height * 3:
+            return None
+        return pixels.reshape((envelope.height, envelope.width, 3))
+    if envelope.encoding == ENCODING_JPEG:
+        return cv2.imdecode(pixels, flags=cv2.IMREAD_COLOR)
+    return None
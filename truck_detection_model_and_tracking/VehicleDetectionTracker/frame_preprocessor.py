@@ -0,0 +1,101 @@
+import math
+import cv2
+import numpy as np
+
+# Preprocessing modes of the frames given to the detector
+PREPROCESSING_MODES = ("off", "gain", "gamma", "auto")
+
+
+class FramePreprocessor:
+
+    def __init__(self, mode="gain", gain=1.5, gamma=1.0, target_brightness=0.45, auto_interval=15,
+                 auto_smoothing=0.3, auto_gamma_range=(0.4, 2.5), histogram_step=8, in_place=False):
+        """
+        Initialize the preprocessing applied to the frames before detection.
+
+        Every mode is a single pass over the frame, written into a buffer reused from frame to frame, or into the
+        frame itself with in_place. No frame is allocated once the buffer exists.
+            - "off": frames are given to the detector as is, without any pass.
+            - "gain": pixels are multiplied by gain and saturated, with the vectorized cv2.convertScaleAbs.
+            - "gamma": pixels are corrected with a fixed gamma, which brightens the shadows without clipping highlights.
+            - "auto": the gamma is chosen so that the median brightness of the frame reaches target_brightness.
+              The histogram is computed on a frame subsampled by histogram_step, every auto_interval frames.
+        The "gamma" and "auto" modes go through a 256 entry lookup table (cv2.LUT).
+
+        Args:
+            mode (str): One of PREPROCESSING_MODES.
+            gain (float): Gain of the "gain" mode.
+            gamma (float): Gamma of the "gamma" mode, below 1 to brighten.
+            target_brightness (float): Median brightness targeted by the "auto" mode, between 0 and 1.
+            auto_interval (int): Number of frames between two exposure measurements of the "auto" mode.
+            auto_smoothing (float): Weight of the newest measurement in the gamma of the "auto" mode, to avoid flicker.
+            auto_gamma_range (tuple): Minimum and maximum gamma of the "auto" mode.
+            histogram_step (int): Subsampling of the frame for the histogram of the "auto" mode.
+            in_place (bool): Write into the frame itself when it is writable, instead of into the reused buffer.
+                The crops and original frames of the responses are then preprocessed too.
+        """
+        if mode not in PREPROCESSING_MODES:
+            raise ValueError(f"mode must be one of {PREPROCESSING_MODES}")
+        self.mode = mode
+        self.gain = gain
+        self.gamma = gamma
+        self.target_brightness = target_brightness
+        self.auto_interval = auto_interval
+        self.auto_smoothing = auto_smoothing
+        self.auto_gamma_range = auto_gamma_range
+        self.histogram_step = histogram_step
+        self.in_place = in_place
+        self.buffer = None
+        self.frames = 0
+        self.lut = None
+        self.auto_gamma = None
+        if mode == "gamma":
+            self.lut = self._gamma_lut(gamma)
+
+    @staticmethod
+    def _gamma_lut(gamma):
+        return np.clip(np.rint(255.0 * (np.arange(256) / 255.0) ** gamma), 0, 255).astype(np.uint8)
+
+    def _measure_gamma(self, frame):
+        # Median brightness of the subsampled frame, from its histogram
+        sample = frame[::self.histogram_step, ::self.histogram_step]
+        histogram = np.bincount(sample.reshape(-1), minlength=256)
+        median = np.searchsorted(np.cumsum(histogram), sample.size / 2) / 255.0
+        median = min(max(median, 1.0 / 255), 254.0 / 255)
+        low, high = self.auto_gamma_range
+        return min(max(math.log(self.target_brightness) / math.log(median), low), high)
+
+    def _update_auto_lut(self, frame):
+        if self.lut is not None and self.frames % self.auto_interval != 0:
+            return
+        gamma = self._measure_gamma(frame)
+        if self.auto_gamma is None:
+            self.auto_gamma = gamma
+        else:
+            self.auto_gamma += self.auto_smoothing * (gamma - self.auto_gamma)
+        self.lut = self._gamma_lut(self.auto_gamma)
+
+    def apply(self, frame):
+        """
+        Preprocess a frame for the detector.
+
+        Args:
+            frame (numpy.ndarray): BGR frame. It is only modified with in_place.
+
+        Returns:
+            numpy.ndarray: The preprocessed frame: the frame itself, or the reused buffer, which the next call overwrites.
+        """
+        if self.mode == "off":
+            return frame
+        if self.mode == "auto":
+            self._update_auto_lut(frame)
+        self.frames += 1
+        if self.in_place and frame.flags.writeable:
+            output = frame
+        else:
+            if self.buffer is None or self.buffer.shape != frame.shape or self.buffer.dtype != frame.dtype:
+                self.buffer = np.empty_like(frame)
+            output = self.buffer
+        if self.mode == "gain":
+            return cv2.convertScaleAbs(frame, dst=output, alpha=self.gain, beta=0)
+        return cv2.LUT(frame, self.lut, dst=output)
@@ -0,0 +1,235 @@
+import base64
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import cv2
+import numpy as np
+from VehicleDetectionTracker.frame_envelope import is_frame_envelope, unpack_frame, decode_frame
+
+# Error code of confluent_kafka.KafkaError._PARTITION_EOF, which is not an actual error
+_PARTITION_EOF = -191
+
+
+def _parse_timestamp(frame_timestamp):
+    # Cameras send ISO 8601 strings or epoch seconds, frames without a usable timestamp get the reception time
+    if isinstance(frame_timestamp, (int, float)):
+        return datetime.fromtimestamp(frame_timestamp)
+    try:
+        return datetime.fromisoformat(frame_timestamp)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return datetime.fromtimestamp(float(frame_timestamp))
+    except (TypeError, ValueError):
+        return datetime.now()
+
+
+def decode_frame_message(value):
+    """
+    Decode the payload of a camera message.
+
+    Args:
+        value (bytes): Binary frame envelope (see frame_envelope), or JSON payload with the "mac_address",
+            "frame_timestamp" and the base64 JPEG "frame_data" of the frame.
+
+    Returns:
+        tuple or None: (mac_address, frame_timestamp, frame), or None if the payload cannot be decoded, e.g. a
+        tombstone without payload.
+    """
+    try:
+        if not isinstance(value, (bytes, bytearray, memoryview)):
+            raise TypeError(f"Expected a bytes payload, got {type(value).__name__}")
+        if is_frame_envelope(value):
+            envelope = unpack_frame(value)
+            frame = decode_frame(envelope)
+            if frame is None:
+                return None
+            return envelope.camera_id, envelope.frame_timestamp, frame
+        payload = json.loads(value)
+        image_data = base64.b64decode(payload.get('frame_data', ''))
+        frame = cv2.imdecode(np.frombuffer(image_data, dtype=np.uint8), flags=cv2.IMREAD_COLOR)
+    except Exception:
+        return None
+    if frame is None:
+        return None
+    return payload.get('mac_address', ''), _parse_timestamp(payload.get('frame_timestamp')), frame
+
+
+class KafkaTrackingService:
+
+    def __init__(self, consumer, producer, output_topic, tracker=None, batch_size=32, poll_timeout=1.0,
+                 decode_workers=None, response_options=None):
+        """
+        Initialize a service that tracks vehicles in the camera frames of a Kafka topic.
+
+        Messages are consumed in batches, decoded on a pool of worker threads and routed by MAC address to the
+        tracking state of their camera, so the frames of all the cameras in a batch share detector calls.
+        Results are published to the output topic, and offsets are committed only once every result of the batch
+        has been delivered. A failed delivery stops the service without committing, so that the batch is consumed
+        again once the service is restarted.
+
+        The consumer and producer only need the subset of the confluent_kafka API used here (consume, commit,
+        produce with an on_delivery callback, poll and flush), so the service can run against an in-process fake
+        broker.
+
+        Args:
+            consumer (confluent_kafka.Consumer): Consumer subscribed to the camera topic, with enable.auto.commit disabled.
+            producer (confluent_kafka.Producer): Producer of the results.
+            output_topic (str): Topic the results are published to.
+            tracker (MultiStreamTracker, optional): Tracker holding the state of every camera. Created on first use if omitted.
+            batch_size (int): Maximum number of messages consumed at once.
+            poll_timeout (float): Maximum time to wait for a batch, in seconds.
+            decode_workers (int, optional): Number of decoding threads, defaults to the ThreadPoolExecutor default.
+            response_options (dict, optional): Options of the responses, see VehicleDetectionTracker.process_tracking_result.
+                By default no image is included and only the structured detections are published.
+        """
+        self.consumer = consumer
+        self.producer = producer
+        self.output_topic = output_topic
+        self.tracker = tracker
+        self.batch_size = batch_size
+        self.poll_timeout = poll_timeout
+        self.decode_pool = ThreadPoolExecutor(max_workers=decode_workers, thread_name_prefix="KafkaTrackingService-decode")
+        self.response_options = response_options if response_options is not None else {
+            "include_original": False,
+            "include_annotated": False,
+            "include_crops": False
+        }
+        self.stats = {"messages_consumed": 0, "frames_processed": 0, "decode_errors": 0, "results_published": 0,
+                      "delivery_errors": 0}
+        self._batch_delivery_errors = 0
+        self._running = False
+
+    @classmethod
+    def from_config(cls, bootstrap_servers, group_id, input_topic, output_topic, **kwargs):
+        """
+        Create a service connected to a Kafka broker.
+
+        Args:
+            bootstrap_servers (str): Address of the Kafka broker.
+            group_id (str): Consumer group of the service.
+            input_topic (str): Topic of the camera frames.
+            output_topic (str): Topic the results are published to.
+            **kwargs: Other arguments of KafkaTrackingService.
+
+        Returns:
+            KafkaTrackingService: The service, subscribed to the input topic.
+        """
+        from confluent_kafka import Consumer, Producer
+        consumer = Consumer({
+            'bootstrap.servers': bootstrap_servers,
+            'group.id': group_id,
+            'auto.offset.reset': 'earliest',
+            'enable.auto.commit': False  # Offsets are committed once the frames have been processed
+        })
+        consumer.subscribe([input_topic])
+        producer = Producer({'bootstrap.servers': bootstrap_servers})
+        return cls(consumer, producer, output_topic, **kwargs)
+
+    def _get_tracker(self):
+        if self.tracker is None:
+            from VehicleDetectionTracker.multi_stream_tracker import MultiStreamTracker
+            self.tracker = MultiStreamTracker()
+        return self.tracker
+
+    def _valid_messages(self, messages):
+        valid = []
+        for msg in messages:
+            error = msg.error()
+            if error is None:
+                valid.append(msg)
+            elif error.code() != _PARTITION_EOF:
+                print('Kafka error: {}'.format(error))
+        return valid
+
+    def _on_delivery(self, error, msg):
+        # Called by producer.poll and producer.flush once the broker has acknowledged or rejected a result
+        if error is not None:
+            print('Delivery failed: {}'.format(error))
+            self._batch_delivery_errors += 1
+            self.stats["delivery_errors"] += 1
+
+    def _publish(self, mac_address, response):
+        self.producer.produce(self.output_topic, key=mac_address, value=json.dumps(response, default=str),
+                              on_delivery=self._on_delivery)
+        self.producer.poll(0)
+        self.stats["results_published"] += 1
+
+    def process_batch(self):
+        """
+        Consume, process and publish a batch of messages, then commit their offsets.
+
+        Returns:
+            int: Number of messages consumed.
+
+        Raises:
+            RuntimeError: If some results of the batch were not delivered. The offsets are not committed.
+        """
+        messages = self.consumer.consume(num_messages=self.batch_size, timeout=self.poll_timeout)
+        if not messages:
+            return 0
+        self.stats["messages_consumed"] += len(messages)
+        self._batch_delivery_errors = 0
+        decoded = list(self.decode_pool.map(lambda msg: decode_frame_message(msg.value()),
+                                            self._valid_messages(messages)))
+
+        # Route the frames to their camera, keeping the order of the frames of each camera
+        frames_by_camera = {}
+        for item in decoded:
+            if item is None:
+                self.stats["decode_errors"] += 1
+                continue
+            mac_address, frame_timestamp, frame = item
+            frames_by_camera.setdefault(mac_address, []).append((frame, frame_timestamp))
+
+        # Each round processes the next frame of every camera with a single detector call
+        tracker = self._get_tracker()
+        round_index = 0
+        while frames_by_camera:
+            frames = {mac_address: camera_frames[round_index] for mac_address, camera_frames in frames_by_camera.items()}
+            responses = tracker.process_frames(frames, **self.response_options)
+            for mac_address, response in responses.items():
+                response["mac_address"] = mac_address
+                self._publish(mac_address, response)
+            self.stats["frames_processed"] += len(frames)
+            round_index += 1
+            frames_by_camera = {mac_address: camera_frames for mac_address, camera_frames in frames_by_camera.items()
+                                if len(camera_frames) > round_index}
+
+        # Commit only once every result of the batch has been delivered, flush returns the number of results
+        # still waiting for their delivery
+        undelivered = self.producer.flush() + self._batch_delivery_errors
+        if undelivered:
+            raise RuntimeError(f"{undelivered} results of the batch were not delivered, offsets not committed")
+        self.consumer.commit(asynchronous=False)
+        return len(messages)
+
+    def run(self, max_batches=None):
+        """
+        Process batches until stop is called or max_batches batches have been consumed.
+
+        Args:
+            max_batches (int, optional): Number of batches to consume, unlimited if omitted.
+        """
+        self._running = True
+        batches = 0
+        try:
+            while self._running and (max_batches is None or batches < max_batches):
+                self.process_batch()
+                batches += 1
+        finally:
+            self._running = False
+
+    def stop(self):
+        """
+        Stop the service after the batch being processed.
+        """
+        self._running = False
+
+    def close(self):
+        """
+        Stop the service and release the consumer and the decoding threads.
+        """
+        self.stop()
+        self.decode_pool.shutdown()
+        self.consumer.close()
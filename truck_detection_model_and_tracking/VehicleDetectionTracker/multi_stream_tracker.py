@@ -0,0 +1,141 @@
+import time
+
+from VehicleDetectionTracker.VehicleDetectionTracker import VehicleDetectionTracker
+from VehicleDetectionTracker.byte_tracking import TRACKING_CONFIDENCE, create_byte_tracker, update_tracks
+
+
+class MultiStreamTracker:
+
+    def __init__(self, model_path="yolov8n.pt", tracker_config="bytetrack.yaml", frame_rate=30, tracker_factory=None,
+                 conf=TRACKING_CONFIDENCE):
+        """
+        Initialize a tracker for several camera streams that share one detector and one set of classifier models.
+
+        Each stream keeps its own tracking state: ByteTrack state, track history, timestamps and classifier cache.
+        The classifiers of each stream are created at its first classification, and their models are loaded once
+        for every stream by the process-wide model registry.
+
+        Args:
+            model_path (str): Path to the YOLO model file, loaded once for every stream.
+            tracker_config (str): ByteTrack configuration file.
+            frame_rate (int): Frame rate of the streams, used by ByteTrack to size its track buffer.
+            tracker_factory (function, optional): Called with the stream ID, the shared model and the ByteTrack
+                state of the stream as keyword arguments, returns the VehicleDetectionTracker of a new stream.
+                The regions of interest of a stream are set there, with a smart_yard_common TiledDetector built
+                on the shared model.
+            conf (float): Confidence threshold of the detector. Defaults to the threshold of YOLO.track, so that
+                the streams are tracked as by a single VehicleDetectionTracker.
+        """
+        # ultralytics is only imported once a tracker is created
+        from ultralytics import YOLO
+        self.model = YOLO(model_path)
+        self.tracker_config = tracker_config
+        self.frame_rate = frame_rate
+        self.tracker_factory = tracker_factory
+        self.conf = conf
+        self.streams = {}  # Stream ID -> VehicleDetectionTracker
+
+    def _create_tracker(self, stream_id):
+        options = {
+            "model": self.model,
+            "byte_tracker": create_byte_tracker(self.tracker_config, self.frame_rate)
+        }
+        if self.tracker_factory is not None:
+            tracker = self.tracker_factory(stream_id, **options)
+            # The shared model must not keep the ByteTrack state of YOLO.track, each stream has its own
+            if tracker.byte_tracker is None:
+                tracker.byte_tracker = options["byte_tracker"]
+            return tracker
+        return VehicleDetectionTracker(**options)
+
+    def get_stream(self, stream_id):
+        """
+        Get the tracker of a stream, creating its state the first time the stream is seen.
+
+        The tracker tracks with the ByteTrack state of its stream, so its process_frame can also be called
+        directly, without mixing the state of several streams.
+
+        Args:
+            stream_id (str): ID of the stream, e.g. the MAC address of the camera.
+
+        Returns:
+            VehicleDetectionTracker: Tracker holding the state of the stream.
+        """
+        if stream_id not in self.streams:
+            self.streams[stream_id] = self._create_tracker(stream_id)
+        return self.streams[stream_id]
+
+    def remove_stream(self, stream_id):
+        """
+        Drop all the tracking state of a stream.
+
+        Args:
+            stream_id (str): ID of the stream.
+        """
+        self.streams.pop(stream_id, None)
+
+    def process_frames(self, frames, **response_options):
+        """
+        Process one frame of several streams, running the detector once for all of them.
+
+        Each stream first goes through the motion gate and the frame stride of its tracker: the streams with a
+        static scene or a skipped frame get their response without the detector, the others are batched.
+
+        Args:
+            frames (dict): Stream ID -> (frame, frame_timestamp).
+            **response_options: Options of the responses, see VehicleDetectionTracker.process_tracking_result.
+
+        Returns:
+            dict: Stream ID -> response, as returned by VehicleDetectionTracker.process_frame.
+        """
+        responses = {}
+        stream_ids, trackers = [], []
+        for stream_id, (frame, frame_timestamp) in frames.items():
+            tracker = self.get_stream(stream_id)
+            response = tracker.prepare_frame(frame, frame_timestamp, **response_options)
+            if response is not None:
+                responses[stream_id] = response
+            else:
+                stream_ids.append(stream_id)
+                trackers.append(tracker)
+        # Each stream has its own preprocessing buffer, so the inputs of the batch do not overwrite each other
+        inputs = [tracker.preprocessor.apply(frames[stream_id][0]) for stream_id, tracker in zip(stream_ids, trackers)]
+        # A single detector call for the full frames of every stream; the streams with regions of interest
+        # run the detector on their own crops and tiles
+        full_frame = [i for i, tracker in enumerate(trackers) if tracker.region_detector is None]
+        results = [None] * len(stream_ids)
+        detection_times = [0.0] * len(stream_ids)
+        if full_frame:
+            start = time.perf_counter()
+            batch = self.model.predict([inputs[i] for i in full_frame], conf=self.conf, verbose=False)
+            # Each stream of the batch is charged its share of the detector call in its frame stride
+            batch_time = (time.perf_counter() - start) / len(full_frame)
+            for i, result in zip(full_frame, batch):
+                start = time.perf_counter()
+                results[i] = update_tracks(result, trackers[i].byte_tracker, inputs[i])
+                detection_times[i] = batch_time + time.perf_counter() - start
+        for i, tracker in enumerate(trackers):
+            if tracker.region_detector is not None:
+                start = time.perf_counter()
+                results[i] = tracker.detect(inputs[i])
+                detection_times[i] = time.perf_counter() - start
+        for stream_id, tracker, result, detection_time in zip(stream_ids, trackers, results, detection_times):
+            frame, frame_timestamp = frames[stream_id]
+            responses[stream_id] = tracker.finish_frame(frame, frame_timestamp, result, detection_time,
+                                                        **response_options)
+        return {stream_id: responses[stream_id] for stream_id in frames}
+
+    def process_frame(self, stream_id, frame, frame_timestamp, **response_options):
+        """
+        Process a single frame of a stream.
+
+        Args:
+            stream_id (str): ID of the stream.
+            frame (numpy.ndarray): Input frame for processing.
+            frame_timestamp (datetime): Timestamp of the frame.
+            **response_options: Options of the response, see VehicleDetectionTracker.process_tracking_result.
+
+        Returns:
+            dict: Processed information of the frame, as returned by VehicleDetectionTracker.process_frame.
+        """
+        return self.process_frames({stream_id: (frame, frame_timestamp)}, **response_options)[stream_id]
@@ -0,0 +1,181 @@
+import argparse
+import glob
+import json
+import os
+import time
+import cv2
+import numpy as np
+from VehicleDetectionTracker.convert_classifiers import CLASSIFIERS, get_classifier_class, convert_to_onnx
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def load_crops(directory, max_crops=None):
+    """
+    Load the vehicle crops stored in a directory, e.g. the crops saved by the tracker.
+
+    Args:
+        directory (str): Directory of the crops, searched recursively.
+        max_crops (int, optional): Maximum number of crops to load.
+
+    Returns:
+        list: BGR crops as numpy arrays, in the order of their paths.
+    """
+    paths = sorted(path for path in glob.glob(os.path.join(directory, "**", "*"), recursive=True)
+                   if path.lower().endswith(IMAGE_EXTENSIONS))
+    crops = []
+    for path in paths:
+        crop = cv2.imread(path, cv2.IMREAD_COLOR)
+        if crop is not None and crop.size > 0:
+            crops.append(crop)
+            if max_crops is not None and len(crops) >= max_crops:
+                break
+    return crops
+
+
+def _calibration_reader(classifier, model_file, crops, batch_size):
+    import onnxruntime as ort
+    from onnxruntime.quantization import CalibrationDataReader
+    input_name = ort.InferenceSession(model_file, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+
+    class CropCalibrationReader(CalibrationDataReader):
+        # Feeds the crops to the calibration, preprocessed exactly like at inference time
+        def __init__(self):
+            self.offset = 0
+
+        def get_next(self):
+            if self.offset >= len(crops):
+                return None
+            batch = classifier.preprocess_batch(crops[self.offset:self.offset + batch_size])
+            self.offset += batch_size
+            return {input_name: batch}
+
+    return CropCalibrationReader()
+
+
+def quantize_classifier(classifier_class, calibration_crops, output_file, per_channel=True, batch_size=16):
+    """
+    Quantize a classifier to INT8 with static post-training quantization.
+
+    Weights are quantized per channel to int8 and activations to uint8, with ranges calibrated on the stored
+    crops. The FP32 ONNX model is converted from the frozen graph first if it does not exist yet.
+
+    Args:
+        classifier_class (type): Classifier class, whose config gives the FP32 model.
+        calibration_crops (list): BGR crops used to calibrate the activation ranges.
+        output_file (str): Path to the INT8 .onnx model.
+        per_channel (bool): Quantize the weights per output channel instead of per tensor.
+        batch_size (int): Number of crops per calibration batch.
+
+    Returns:
+        str: Path to the INT8 .onnx model.
+    """
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+    if len(calibration_crops) == 0:
+        raise ValueError("No calibration crop")
+    if not os.path.exists(classifier_class.onnx_model_file):
+        convert_to_onnx(classifier_class, classifier_class.onnx_model_file)
+
+    # Shape inference and graph optimizations make the quantization cover more operators
+    preprocessed_file = os.path.splitext(output_file)[0] + "-preprocessed.onnx"
+    quant_pre_process(classifier_class.onnx_model_file, preprocessed_file)
+    reader = _calibration_reader(classifier_class(backend="onnxruntime"), preprocessed_file, calibration_crops, batch_size)
+    try:
+        quantize_static(preprocessed_file, output_file, reader,
+                        quant_format=QuantFormat.QDQ, per_channel=per_channel,
+                        activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+    finally:
+        os.remove(preprocessed_file)
+    return output_file
+
+
+def _top_classes(predictions):
+    # predictions are the formatted top 3 of predict, the classes are the formatted dicts without their probability
+    return [tuple(sorted((key, value) for key, value in prediction.items() if key != "prob")) for prediction in predictions]
+
+
+def _latency_ms(classifier, crops):
+    classifier.predict(crops[0])  # Warm up
+    latencies = []
+    predictions = []
+    for crop in crops:
+        start = time.perf_counter()
+        predictions.append(classifier.predict(crop))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return predictions, {
+        "mean": float(np.mean(latencies)),
+        "p50": float(np.percentile(latencies, 50)),
+        "p95": float(np.percentile(latencies, 95))
+    }
+
+
+def compare_quantized(classifier_class, crops, reference_backend="tensorflow"):
+    """
+    Compare the INT8 model of a classifier with the FP32 predict output.
+
+    Args:
+        classifier_class (type): Classifier class.
+        crops (list): BGR crops to compare on, preferably not the calibration crops.
+        reference_backend (str): Backend of the FP32 reference.
+
+    Returns:
+        dict: Number of crops, top-1 agreement (same top class), top-3 agreement (FP32 top class within the INT8
+            top 3), and the per-crop latency in milliseconds of both models.
+    """
+    fp32_predictions, fp32_latency = _latency_ms(classifier_class(backend=reference_backend, quantized=False), crops)
+    int8_predictions, int8_latency = _latency_ms(classifier_class(backend="onnxruntime", quantized=True), crops)
+    top1 = top3 = 0
+    for fp32, int8 in zip(fp32_predictions, int8_predictions):
+        fp32_classes, int8_classes = _top_classes(fp32), _top_classes(int8)
+        top1 += fp32_classes[0] == int8_classes[0]
+        top3 += fp32_classes[0] in int8_classes
+    return {
+        "crops": len(crops),
+        "top1_agreement": top1 / len(crops),
+        "top3_agreement": top3 / len(crops),
+        "fp32_backend": reference_backend,
+        "fp32_latency_ms": fp32_latency,
+        "int8_latency_ms": int8_latency,
+        "speedup": fp32_latency["mean"] / int8_latency["mean"]
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Quantize the color and make/model classifiers to INT8 and report "
+                                     "their agreement with the FP32 models.")
+    parser.add_argument("--calibration-dir", required=True, help="Directory of stored vehicle crops used for calibration.")
+    parser.add_argument("--eval-dir", default=None, help="Directory of crops for the report, defaults to the calibration crops.")
+    parser.add_argument("--classifier", choices=CLASSIFIERS + ("all",), default="all", help="Classifier to quantize.")
+    parser.add_argument("--max-calibration-crops", type=int, default=500, help="Maximum number of calibration crops.")
+    parser.add_argument("--max-eval-crops", type=int, default=500, help="Maximum number of crops for the report.")
+    parser.add_argument("--per-tensor", action="store_true", help="Quantize the weights per tensor instead of per channel.")
+    parser.add_argument("--reference-backend", choices=("tensorflow", "onnxruntime"), default="tensorflow",
+                        help="Backend of the FP32 reference of the report.")
+    parser.add_argument("--report", default=None, help="Path to the JSON report.")
+    parser.add_argument("--skip-quantization", action="store_true", help="Only report on the existing INT8 models.")
+    args = parser.parse_args(argv)
+
+    calibration_crops = load_crops(args.calibration_dir, args.max_calibration_crops)
+    eval_crops = load_crops(args.eval_dir, args.max_eval_crops) if args.eval_dir else calibration_crops[:args.max_eval_crops]
+    print(f"{len(calibration_crops)} calibration crops, {len(eval_crops)} evaluation crops")
+
+    report = {}
+    names = CLASSIFIERS if args.classifier == "all" else (args.classifier,)
+    for name in names:
+        classifier_class = get_classifier_class(name)
+        if not args.skip_quantization:
+            print(f"Quantizing the {name} classifier to {classifier_class.int8_onnx_model_file}")
+            quantize_classifier(classifier_class, calibration_crops, classifier_class.int8_onnx_model_file,
+                                per_channel=not args.per_tensor)
+        if eval_crops:
+            report[name] = compare_quantized(classifier_class, eval_crops, args.reference_backend)
+            print(name, json.dumps(report[name], indent=2))
+
+    if args.report is not None:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+import os
+
+
+def resource_filename(package, resource):
+    """
+    Get the path to a data file of a package, like pkg_resources.resource_filename without importing pkg_resources.
+
+    Args:
+        package (str): Name of the package, e.g. 'VehicleDetectionTracker'.
+        resource (str): Path to the file relative to the package, e.g. 'data/color_labels.txt'.
+
+    Returns:
+        str: Path to the file.
+    """
+    try:
+        from importlib.resources import files
+    except ImportError:  # Python < 3.9
+        import importlib
+        return os.path.join(os.path.dirname(importlib.import_module(package).__file__), resource)
+    return str(files(package).joinpath(resource))
@@ -0,0 +1,205 @@
+import math
+from collections import deque
+import numpy as np
+
+# Ways of smoothing the speed of a track
+SMOOTHING_METHODS = ("window", "ema", "kalman")
+
+# Labels of the 8 direction bins of pi/4 radians, starting with the bin centered on 0 radians
+DIRECTION_LABELS = np.array(["Right", "Bottom Right", "Bottom", "Bottom Left", "Left", "Top Left", "Top", "Top Right", None],
+                            dtype=object)
+
+
+def directions_to_labels(directions):
+    """
+    Map directions to their labels with a lookup table, in a single array operation.
+
+    Args:
+        directions (numpy.ndarray): Directions in radians, as atan2(dy, dx) in image coordinates. NaN for unknown directions.
+
+    Returns:
+        list: Label of each direction, None for unknown directions.
+    """
+    directions = np.asarray(directions, dtype=np.float64)
+    bins = np.floor((directions + np.pi / 8) / (np.pi / 4))
+    # Unknown directions go to the last entry of the table
+    bins = np.where(np.isnan(bins), 8, np.mod(np.nan_to_num(bins), 8)).astype(np.int64)
+    return DIRECTION_LABELS[bins].tolist()
+
+
+def _to_seconds(frame_timestamp):
+    # Frame timestamps are datetimes, but epoch seconds are accepted too
+    if hasattr(frame_timestamp, "timestamp"):
+        return frame_timestamp.timestamp()
+    return float(frame_timestamp)
+
+
+class SpeedEstimator:
+
+    def __init__(self, window_size=30, smoothing="window", pixels_per_meter=None, ema_alpha=0.3,
+                 process_noise=50.0, measurement_noise=4.0):
+        """
+        Initialize an incremental speed and heading estimator for a single track.
+
+        Every observation is processed in constant time: the "window" method keeps a running sum of the speeds
+        of the last window_size steps, "ema" an exponential moving average of them, and "kalman" a constant
+        velocity Kalman filter over the position of the track.
+
+        Args:
+            window_size (int): Number of observations the speed and heading are computed over.
+            smoothing (str): Smoothing method, one of SMOOTHING_METHODS.
+            pixels_per_meter (float or None): Calibration of the camera, in pixels per meter at the road plane.
+                Without calibration, speeds are in pixels per second, reported as if pixels were meters.
+            ema_alpha (float): Weight of the newest step speed with the "ema" method.
+            process_noise (float): Acceleration noise of the "kalman" method, in pixels per second squared.
+            measurement_noise (float): Position noise of the "kalman" method, in pixels.
+        """
+        if smoothing not in SMOOTHING_METHODS:
+            raise ValueError(f"smoothing must be one of {SMOOTHING_METHODS}")
+        self.smoothing = smoothing
+        self.pixels_per_meter = pixels_per_meter
+        self.ema_alpha = ema_alpha
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.positions = deque(maxlen=window_size)  # Positions in the window, for the heading
+        self.times = deque(maxlen=window_size)  # Timestamps of the positions, in seconds
+        self.step_speeds = deque(maxlen=max(window_size - 1, 1))  # Speeds between consecutive observations
+        self.step_speeds_sum = 0.0
+        self.ema_speed = None
+        self.samples = 0  # Number of observations in the window
+        self.last_time = None
+        self.last_position = None
+        self.state = None  # Kalman state [x, y, vx, vy]
+        self.covariance = None
+
+    def update(self, frame_timestamp, x, y):
+        """
+        Add an observation of the track.
+
+        Args:
+            frame_timestamp (datetime or float): Timestamp of the frame, or epoch seconds.
+            x (float): X coordinate of the center of the track's bounding box, in pixels.
+            y (float): Y coordinate of the center of the track's bounding box, in pixels.
+        """
+        t = _to_seconds(frame_timestamp)
+        self.positions.append((x, y))
+        self.times.append(t)
+        self.samples = len(self.positions)
+        if self.last_time is not None:
+            delta_t = t - self.last_time
+            if delta_t > 0:
+                distance = math.hypot(x - self.last_position[0], y - self.last_position[1])
+                step_speed = distance / delta_t
+                if len(self.step_speeds) == self.step_speeds.maxlen:
+                    self.step_speeds_sum -= self.step_speeds[0]
+                self.step_speeds.append(step_speed)
+                self.step_speeds_sum += step_speed
+                if self.ema_speed is None:
+                    self.ema_speed = step_speed
+                else:
+                    self.ema_speed += self.ema_alpha * (step_speed - self.ema_speed)
+                if self.smoothing == "kalman":
+                    self._kalman_update(delta_t, x, y)
+        elif self.smoothing == "kalman":
+            self.state = np.array([x, y, 0.0, 0.0])
+            self.covariance = np.diag([self.measurement_noise ** 2] * 2 + [1e4] * 2)
+        self.last_time = t
+        self.last_position = (x, y)
+
+    def _kalman_update(self, delta_t, x, y):
+        F = np.eye(4)
+        F[0, 2] = F[1, 3] = delta_t
+        # Discrete white noise acceleration model
+        q = self.process_noise ** 2
+        Q = np.zeros((4, 4))
+        Q[0, 0] = Q[1, 1] = q * delta_t ** 4 / 4
+        Q[0, 2] = Q[2, 0] = Q[1, 3] = Q[3, 1] = q * delta_t ** 3 / 2
+        Q[2, 2] = Q[3, 3] = q * delta_t ** 2
+        # Predict
+        self.state = F @ self.state
+        self.covariance = F @ self.covariance @ F.T + Q
+        # Correct with the observed position
+        S = self.covariance[:2, :2] + np.eye(2) * self.measurement_noise ** 2
+        K = self.covariance[:, :2] @ np.linalg.inv(S)
+        self.state = self.state + K @ (np.array([x, y]) - self.state[:2])
+        self.covariance = (np.eye(4) - K @ np.eye(2, 4)) @ self.covariance
+
+    def speed_pixels_per_second(self):
+        """
+        Returns:
+            float or None: Smoothed speed of the track in pixels per second, None until it can be computed.
+        """
+        if len(self.step_speeds) == 0:
+            return None
+        if self.smoothing == "kalman":
+            return math.hypot(self.state[2], self.state[3])
+        if self.smoothing == "ema":
+            return self.ema_speed
+        return self.step_speeds_sum / len(self.step_speeds)
+
+    def heading_vector(self):
+        """
+        Returns:
+            tuple: Displacement (dx, dy) of the track over the window, or its velocity with the "kalman" method.
+            (NaN, NaN) until the track has at least two observations.
+        """
+        if self.samples < 2:
+            return (math.nan, math.nan)
+        if self.smoothing == "kalman" and (self.state[2] != 0 or self.state[3] != 0):
+            return (self.state[2], self.state[3])
+        initial_x, initial_y = self.positions[0]
+        final_x, final_y = self.positions[-1]
+        return (final_x - initial_x, final_y - initial_y)
+
+    def velocity(self):
+        """
+        Returns:
+            tuple or None: Velocity (vx, vy) of the track in pixels per second, averaged over the window or
+            filtered with the "kalman" method. None until the track has at least two observations.
+        """
+        if self.samples < 2:
+            return None
+        if self.smoothing == "kalman" and len(self.step_speeds) > 0:
+            return (self.state[2], self.state[3])
+        time_span = self.times[-1] - self.times[0]
+        if time_span <= 0:
+            return None
+        initial_x, initial_y = self.positions[0]
+        final_x, final_y = self.positions[-1]
+        return ((final_x - initial_x) / time_span, (final_y - initial_y) / time_span)
+
+    def direction(self):
+        """
+        Returns:
+            float or None: Heading of the track in radians, as atan2(dy, dx) in image coordinates,
+            None until the track has at least two observations.
+        """
+        dx, dy = self.heading_vector()
+        if math.isnan(dx):
+            return None
+        return math.atan2(dy, dx)
+
+    def reliability(self):
+        """
+        Returns:
+            float: Reliability of the estimation, based on the number of observations in the window.
+        """
+        if self.samples < 2:
+            return 0.0
+        if self.samples < 5:
+            return 0.5  # Low reliability if there are less than 5 samples
+        if self.samples < 10:
+            return 0.7  # Moderate reliability if there are between 5 and 10 samples
+        return 1.0  # High reliability if there are 10 or more samples
+
+    def speed_kph(self):
+        """
+        Returns:
+            float or None: Speed of the track in kilometers per hour, None until it can be computed.
+        """
+        speed = self.speed_pixels_per_second()
+        if speed is None:
+            return None
+        meters_per_second = speed / self.pixels_per_meter if self.pixels_per_meter else speed
+        # 1 m/s is approximately 3.6 km/h
+        return meters_per_second * 3.6
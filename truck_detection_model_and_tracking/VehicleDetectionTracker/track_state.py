@@ -0,0 +1,85 @@
+import time
+from collections import deque
+from VehicleDetectionTracker.speed_estimator import SpeedEstimator
+
+
+class TrackState:
+
+    def __init__(self, max_history_length=30, max_age_frames=30, max_age_seconds=None, speed_estimator_factory=SpeedEstimator):
+        """
+        Initialize the bounded state of the tracked vehicles.
+
+        Each track keeps at most max_history_length positions and a constant size speed estimator, and tracks
+        that have not been seen for max_age_frames frames or max_age_seconds seconds are evicted, so memory and
+        per-frame work stay flat however long the tracker runs.
+
+        Args:
+            max_history_length (int): Maximum number of positions kept per track.
+            max_age_frames (int or None): Evict the tracks not seen for more than this number of frames.
+            max_age_seconds (float or None): Evict the tracks not seen for more than this number of seconds.
+            speed_estimator_factory (function): Creates the SpeedEstimator of a new track.
+        """
+        self.max_history_length = max_history_length
+        self.max_age_frames = max_age_frames
+        self.max_age_seconds = max_age_seconds
+        self.speed_estimator_factory = speed_estimator_factory
+        self.tracks = {}
+        self.evicted_count = 0
+
+    def __len__(self):
+        return len(self.tracks)
+
+    def __contains__(self, track_id):
+        return track_id in self.tracks
+
+    def update(self, track_id, frame_index, frame_timestamp, x, y):
+        """
+        Record the position of a track in the current frame and update its speed estimation.
+
+        Args:
+            track_id (int): ID of the track.
+            frame_index (int): Index of the current frame.
+            frame_timestamp (datetime): Timestamp of the frame.
+            x (float): X coordinate of the center of the track's bounding box.
+            y (float): Y coordinate of the center of the track's bounding box.
+
+        Returns:
+            dict: State of the track, with its "positions" history and its "speed" estimator.
+        """
+        track = self.tracks.get(track_id)
+        if track is None:
+            track = {
+                "positions": deque(maxlen=self.max_history_length),
+                "speed": self.speed_estimator_factory()
+            }
+            self.tracks[track_id] = track
+        track["positions"].append((x, y))
+        track["speed"].update(frame_timestamp, x, y)
+        track["last_seen_frame"] = frame_index
+        track["last_seen_time"] = time.monotonic()
+        return track
+
+    def get(self, track_id):
+        return self.tracks.get(track_id)
+
+    def evict(self, frame_index):
+        """
+        Evict the tracks that are older than the maximum age.
+
+        Args:
+            frame_index (int): Index of the current frame.
+
+        Returns:
+            list: IDs of the evicted tracks.
+        """
+        now = time.monotonic()
+        evicted = []
+        for track_id, track in self.tracks.items():
+            if self.max_age_frames is not None and frame_index - track["last_seen_frame"] > self.max_age_frames:
+                evicted.append(track_id)
+            elif self.max_age_seconds is not None and now - track["last_seen_time"] > self.max_age_seconds:
+                evicted.append(track_id)
+        for track_id in evicted:
+            del self.tracks[track_id]
+        self.evicted_count += len(evicted)
+        return evicted
@@ -0,0 +1,185 @@
+import queue
+import threading
+from datetime import datetime
+import cv2
+
+# What the capture stage does when the frame queue is full
+BACKPRESSURE_POLICIES = ("block", "drop_oldest", "drop_newest")
+
+# Marks the end of the stream in the pipeline queues
+_END_OF_STREAM = object()
+
+
+class VideoPipeline:
+
+    def __init__(self, tracker, queue_size=8, backpressure="block", headless=False, crop_format="base64",
+                 frame_format="base64", window_name="Video Detection Tracker - YOLOv8 + bytetrack", **response_options):
+        """
+        Initialize a decode -> infer -> publish pipeline around a VehicleDetectionTracker.
+
+        Frames are read by a capture thread into a bounded queue, processed by an inference thread and handed to
+        the publish stage, which encodes the images, displays the annotated frame and calls the result callback.
+        Decoding and encoding therefore overlap with inference.
+
+        Args:
+            tracker (VehicleDetectionTracker): Tracker used by the inference stage.
+            queue_size (int): Maximum number of frames waiting between two stages.
+            backpressure (str): Policy of the capture stage when the frame queue is full, one of BACKPRESSURE_POLICIES.
+                "block" waits for the inference stage, "drop_oldest" discards the oldest queued frame and
+                "drop_newest" discards the frame that has just been read.
+            headless (bool): Do not plot nor display the annotated frame.
+            crop_format (str): Format of the vehicle crops handed to the callback, one of IMAGE_FORMATS.
+            frame_format (str): Format of the original and annotated frames handed to the callback, one of IMAGE_FORMATS.
+            window_name (str): Name of the display window.
+            **response_options: Other options forwarded to process_frame (include_original, include_crops).
+        """
+        if backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"backpressure must be one of {BACKPRESSURE_POLICIES}")
+        self.tracker = tracker
+        self.queue_size = queue_size
+        self.backpressure = backpressure
+        self.headless = headless
+        self.crop_format = crop_format
+        self.frame_format = frame_format
+        self.window_name = window_name
+        self.response_options = response_options
+        self.stats = {"frames_read": 0, "frames_dropped": 0, "frames_processed": 0}
+        self._stop_event = threading.Event()
+        self._errors = []
+
+    def stop(self):
+        """
+        Ask every stage to stop after the frame it is working on.
+        """
+        self._stop_event.set()
+
+    def _put_frame(self, frame_queue, item):
+        if self.backpressure == "drop_newest":
+            try:
+                frame_queue.put_nowait(item)
+            except queue.Full:
+                self.stats["frames_dropped"] += 1
+        elif self.backpressure == "drop_oldest":
+            while True:
+                try:
+                    frame_queue.put_nowait(item)
+                    return
+                except queue.Full:
+                    try:
+                        frame_queue.get_nowait()
+                        self.stats["frames_dropped"] += 1
+                    except queue.Empty:
+                        pass
+        else:
+            self._put_blocking(frame_queue, item)
+
+    def _put_blocking(self, target_queue, item):
+        # Wait for room in the queue, but give up if the pipeline is stopped
+        while not self._stop_event.is_set():
+            try:
+                target_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _put_end_of_stream(self, target_queue):
+        # The end marker must get through, a stopped pipeline discards the queued items to make room for it
+        while True:
+            try:
+                target_queue.put(_END_OF_STREAM, timeout=0.1)
+                return
+            except queue.Full:
+                if self._stop_event.is_set():
+                    try:
+                        target_queue.get_nowait()
+                    except queue.Empty:
+                        pass
+
+    def _capture(self, cap, frame_queue):
+        try:
+            while cap.isOpened() and not self._stop_event.is_set():
+                success, frame = cap.read()
+                if not success:
+                    # End of the video
+                    break
+                self.stats["frames_read"] += 1
+                self._put_frame(frame_queue, (frame, datetime.now()))
+        except Exception as e:
+            self._errors.append(e)
+            self.stop()
+        finally:
+            self._put_end_of_stream(frame_queue)
+
+    def _infer(self, frame_queue, result_queue):
+        try:
+            while True:
+                item = frame_queue.get()
+                if item is _END_OF_STREAM or self._stop_event.is_set():
+                    break
+                frame, timestamp = item
+                # Images are kept as ndarrays here, the publish stage encodes them
+                response = self.tracker.process_frame(frame, timestamp, include_annotated=not self.headless,
+                                                      crop_format="ndarray", frame_format="ndarray",
+                                                      **self.response_options)
+                self.stats["frames_processed"] += 1
+                if not self._put_blocking(result_queue, response):
+                    break
+        except Exception as e:
+            self._errors.append(e)
+            self.stop()
+        finally:
+            self._put_end_of_stream(result_queue)
+
+    def run(self, video_path, result_callback):
+        """
+        Process a video, calling a callback with the results of each frame from the calling thread.
+
+        Args:
+            video_path (str): Path to the video file or URL of the stream.
+            result_callback (function): A callback function to handle the processing results for each frame.
+
+        Returns:
+            dict: Number of frames read, dropped by the backpressure policy and processed.
+        """
+        self._stop_event.clear()
+        self._errors = []
+        cap = cv2.VideoCapture(video_path)
+        frame_rate = int(cap.get(cv2.CAP_PROP_FPS))
+        print(f"Frame rate: {frame_rate} FPS")
+
+        frame_queue = queue.Queue(maxsize=self.queue_size)
+        result_queue = queue.Queue(maxsize=self.queue_size)
+        workers = [
+            threading.Thread(target=self._capture, args=(cap, frame_queue), name="VideoPipeline-capture", daemon=True),
+            threading.Thread(target=self._infer, args=(frame_queue, result_queue), name="VideoPipeline-infer", daemon=True)
+        ]
+        for worker in workers:
+            worker.start()
+
+        try:
+            # Publish stage: encode the images, display the annotated frame and call the callback
+            while True:
+                response = result_queue.get()
+                if response is _END_OF_STREAM:
+                    break
+                if not self.headless:
+                    annotated_frame = response.get("annotated_frame")
+                    if annotated_frame is not None:
+                        cv2.imshow(self.window_name, annotated_frame)
+                self.tracker.encode_response_images(response, self.crop_format, self.frame_format)
+                result_callback(response)
+                # Stop the pipeline if 'q' is pressed
+                if not self.headless and cv2.waitKey(1) & 0xFF == ord("q"):
+                    self.stop()
+        finally:
+            self.stop()
+            for worker in workers:
+                worker.join()
+            cap.release()
+            if not self.headless:
+                cv2.destroyAllWindows()
+
+        if self._errors:
+            raise self._errors[0]
+        return dict(self.stats)
@@ -0,0 +1,73 @@
+"""
+Import-time benchmark of the VehicleDetectionTracker package.
+
+Each module is imported in a fresh interpreter, several times, to measure the cold-start cost a worker pays before
+processing its first frame: wall time of the import, peak RSS, and which heavy dependencies were pulled in.
+
+Usage:
+    python benchmarks/import_time.py [--repeat 5] [module ...]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+MODULES = [
+    "VehicleDetectionTracker.frame_envelope",
+    "VehicleDetectionTracker.kafka_service",
+    "VehicleDetectionTracker.VehicleDetectionTracker",
+    "VehicleDetectionTracker.multi_stream_tracker",
+    "VehicleDetectionTracker.color_classifier.classifier",
+    "VehicleDetectionTracker.model_classifier.classifier",
+]
+
+# Dependencies that must not be imported until they are actually used
+HEAVY_MODULES = ["ultralytics", "torch", "tensorflow", "onnxruntime", "openvino", "pkg_resources"]
+
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": elapsed,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "heavy_modules": [name for name in {heavy!r} if name in sys.modules]
+}}))
+"""
+
+
+def measure(module, repeat):
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                                capture_output=True, text=True)
+        if output.returncode != 0:
+            return {"module": module, "error": output.stderr.strip().splitlines()[-1]}
+        runs.append(json.loads(output.stdout))
+    return {
+        "module": module,
+        "median_ms": statistics.median(run["seconds"] for run in runs) * 1000,
+        "max_rss_mb": max(run["max_rss_mb"] for run in runs),
+        "heavy_modules": runs[-1]["heavy_modules"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the import time of the VehicleDetectionTracker modules.")
+    parser.add_argument("modules", nargs="*", default=MODULES, help="Modules to import.")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of fresh interpreters per module.")
+    args = parser.parse_args()
+
+    for module in args.modules:
+        result = measure(module, args.repeat)
+        if "error" in result:
+            print(f"{module:55s} failed: {result['error']}")
+        else:
+            print(f"{module:55s} {result['median_ms']:8.1f} ms {result['max_rss_mb']:8.1f} MB  "
+                  f"heavy: {', '.join(result['heavy_modules']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
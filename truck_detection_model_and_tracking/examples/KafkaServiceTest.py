@@ -0,0 +1,103 @@
+import base64
+import json
+from datetime import datetime
+import cv2
+from VehicleDetectionTracker.kafka_service import KafkaTrackingService
+
+# In-process stand-in for a Kafka broker, implementing the part of the confluent_kafka API used by the service.
+
+class FakeMessage:
+    def __init__(self, topic, key, value, offset):
+        self._topic, self._key, self._value, self._offset = topic, key, value, offset
+
+    def error(self):
+        return None
+
+    def topic(self):
+        return self._topic
+
+    def key(self):
+        return self._key
+
+    def value(self):
+        return self._value
+
+    def partition(self):
+        return 0
+
+    def offset(self):
+        return self._offset
+
+
+class FakeBroker:
+    def __init__(self):
+        self.topics = {}
+        self.committed = 0
+
+    def append(self, topic, key, value):
+        messages = self.topics.setdefault(topic, [])
+        messages.append(FakeMessage(topic, key, value, len(messages)))
+
+
+class FakeConsumer:
+    def __init__(self, broker, topic):
+        self.broker, self.topic, self.position = broker, topic, 0
+
+    def consume(self, num_messages=1, timeout=-1):
+        messages = self.broker.topics.get(self.topic, [])[self.position:self.position + num_messages]
+        self.position += len(messages)
+        return messages
+
+    def commit(self, asynchronous=True):
+        self.broker.committed = self.position
+
+    def close(self):
+        pass
+
+
+class FakeProducer:
+    def __init__(self, broker):
+        self.broker = broker
+
+    def produce(self, topic, key=None, value=None, on_delivery=None):
+        # Like confluent_kafka, str values are sent as UTF-8 and consumed as bytes
+        self.broker.append(topic, key, value.encode() if isinstance(value, str) else value)
+        if on_delivery is not None:
+            on_delivery(None, self.broker.topics[topic][-1])
+
+    def poll(self, timeout=0):
+        return 0
+
+    def flush(self, timeout=None):
+        return 0
+
+
+video_path = "[[YOUR_STREAMING_SOURCE]]"
+broker = FakeBroker()
+cap = cv2.VideoCapture(video_path)
+frame_number = 0
+while cap.isOpened():
+    success, frame = cap.read()
+    if not success:
+        break
+    # Simulate two cameras sending the frames of the video
+    mac_address = "00:00:00:00:00:0{}".format(frame_number % 2)
+    _, buffer = cv2.imencode('.jpg', frame)
+    broker.append('iot-camera-frames', mac_address, json.dumps({
+        'mac_address': mac_address,
+        'frame_timestamp': datetime.now().isoformat(),
+        'frame_data': base64.b64encode(buffer).decode()
+    }).encode())
+    frame_number += 1
+cap.release()
+
+service = KafkaTrackingService(FakeConsumer(broker, 'iot-camera-frames'), FakeProducer(broker), 'iot-camera-detections')
+while service.process_batch() > 0:
+    pass
+service.close()
+
+print(service.stats)
+print(f"Committed offset: {broker.committed}")
+for message in broker.topics.get('iot-camera-detections', []):
+    result = json.loads(message.value())
+    print(message.key(), result["number_of_vehicles_detected"], [vehicle["speed_info"] for vehicle in result["detected_vehicles"]])
@@ -12,6 +12,18 @@ setup(
         'ultralytics==8.0.145',
         'tensorflow==2.14.0'
     ],
+    extras_require={
+        'onnx': ['onnxruntime>=1.16'],
+        'openvino': ['openvino>=2023.1'],
+        'convert': ['tf2onnx>=1.15', 'onnx>=1.14', 'openvino>=2023.1'],
+        'quantize': ['tf2onnx>=1.15', 'onnx>=1.14', 'onnxruntime>=1.16']
+    },
+    entry_points={
+        'console_scripts': [
+            'vehicle-classifier-convert=VehicleDetectionTracker.convert_classifiers:main',
+            'vehicle-classifier-quantize=VehicleDetectionTracker.quantize_classifiers:main'
+        ]
+    },
     author='Sergio Sánchez Sánchez',
     author_email='dreamsoftware92@gmail.com',
     description='VehicleDetectionTracker 🚗: Effortlessly track and detect vehicles in images and videos with advanced algorithms. 🚙🚕 Boost your computer vision project!" 🔍📹',
@@ -0,0 +1,19 @@
+import unittest
+from VehicleDetectionTracker.byte_tracking import TRACKING_CONFIDENCE
+
+try:
+    from smart_yard_common import tiling
+except ImportError:
+    tiling = None
+
+
+class TrackingConfidenceTest(unittest.TestCase):
+
+    @unittest.skipIf(tiling is None, "smart_yard_common is not installed")
+    def test_tiled_detector_tracks_at_the_same_confidence(self):
+        # The regions of interest of a stream are tracked with the same ByteTrack thresholds as its full frames
+        self.assertEqual(tiling.TRACKING_CONFIDENCE, TRACKING_CONFIDENCE)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+from datetime import datetime
+import numpy as np
+from VehicleDetectionTracker.frame_envelope import ENCODING_BGR, HEADER, pack_frame, unpack_frame, decode_frame
+
+
+def _with_timestamp(envelope, timestamp):
+    fields = list(HEADER.unpack_from(envelope))
+    fields[5] = timestamp
+    return HEADER.pack(*fields) + envelope[HEADER.size:]
+
+
+class FrameEnvelopeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.frame = np.arange(4 * 6 * 3, dtype=np.uint8).reshape(4, 6, 3)
+        self.envelope = pack_frame("00:11:22:33:44:55", datetime(2024, 1, 1, 12), self.frame, encoding=ENCODING_BGR)
+
+    def test_round_trip(self):
+        envelope = unpack_frame(self.envelope)
+        self.assertEqual(envelope.camera_id, "00:11:22:33:44:55")
+        self.assertEqual(envelope.frame_timestamp, datetime(2024, 1, 1, 12))
+        np.testing.assert_array_equal(decode_frame(envelope), self.frame)
+
+    def test_invalid_timestamp_raises_value_error(self):
+        for timestamp in (1e300, -1e300, float("nan")):
+            with self.assertRaisesRegex(ValueError, "Invalid frame timestamp"):
+                unpack_frame(_with_timestamp(self.envelope, timestamp))
+
+    def test_truncated_envelope_raises_value_error(self):
+        with self.assertRaisesRegex(ValueError, "Truncated"):
+            unpack_frame(self.envelope[:-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,189 @@
+import base64
+import json
+import unittest
+from datetime import datetime
+import cv2
+import numpy as np
+from VehicleDetectionTracker.frame_envelope import pack_frame
+from VehicleDetectionTracker.kafka_service import KafkaTrackingService
+
+
+class FakeError:
+    def __init__(self, code):
+        self._code = code
+
+    def code(self):
+        return self._code
+
+
+class FakeMessage:
+    def __init__(self, value, error=None):
+        self._value, self._error = value, error
+
+    def error(self):
+        return self._error
+
+    def value(self):
+        return self._value
+
+
+class FakeConsumer:
+    def __init__(self, messages, events):
+        self.messages, self.events = list(messages), events
+        self.commits = 0
+
+    def consume(self, num_messages=1, timeout=-1):
+        batch, self.messages = self.messages[:num_messages], self.messages[num_messages:]
+        return batch
+
+    def commit(self, asynchronous=True):
+        self.commits += 1
+        self.events.append("commit")
+
+    def close(self):
+        pass
+
+
+class FakeProducer:
+    """Delivers the results on flush, failing the ones of the failed keys, and leaving undelivered results."""
+
+    def __init__(self, events, failed_keys=(), undelivered=0):
+        self.events = events
+        self.failed_keys, self.undelivered = set(failed_keys), undelivered
+        self.produced = []
+        self.pending = []
+
+    def produce(self, topic, key=None, value=None, on_delivery=None):
+        self.produced.append((topic, key, json.loads(value)))
+        self.pending.append((key, on_delivery))
+        self.events.append("produce")
+
+    def poll(self, timeout=0):
+        return 0
+
+    def flush(self, timeout=None):
+        self.events.append("flush")
+        for key, on_delivery in self.pending:
+            on_delivery(FakeError(-192) if key in self.failed_keys else None, None)
+        self.pending = []
+        return self.undelivered
+
+
+class StubTracker:
+    """Records the frames routed to each camera, and answers with the index of the frame in its camera."""
+
+    def __init__(self):
+        self.calls = []
+        self.frames_seen = {}
+
+    def process_frames(self, frames, **response_options):
+        self.calls.append(sorted(frames))
+        responses = {}
+        for mac_address, (frame, frame_timestamp) in frames.items():
+            index = self.frames_seen.get(mac_address, 0)
+            self.frames_seen[mac_address] = index + 1
+            responses[mac_address] = {"index": index, "pixel": int(frame[0, 0, 0])}
+        return responses
+
+
+def _frame(value):
+    return np.full((16, 16, 3), value, dtype=np.uint8)
+
+
+def _json_message(mac_address, value):
+    _, buffer = cv2.imencode('.png', _frame(value))
+    return FakeMessage(json.dumps({
+        'mac_address': mac_address,
+        'frame_timestamp': datetime(2024, 1, 1).isoformat(),
+        'frame_data': base64.b64encode(buffer).decode()
+    }).encode())
+
+
+def _envelope_message(mac_address, value):
+    return FakeMessage(pack_frame(mac_address, datetime(2024, 1, 1), _frame(value), encoding=1))
+
+
+class KafkaTrackingServiceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.events = []
+        self.tracker = StubTracker()
+
+    def _service(self, messages, batch_size=32, **producer_options):
+        self.consumer = FakeConsumer(messages, self.events)
+        self.producer = FakeProducer(self.events, **producer_options)
+        return KafkaTrackingService(self.consumer, self.producer, "detections", tracker=self.tracker,
+                                    batch_size=batch_size, decode_workers=2)
+
+    def test_process_batch_routes_frames_by_camera_in_order(self):
+        service = self._service([_json_message("a", 10), _envelope_message("b", 20), _json_message("a", 30),
+                                 _json_message("a", 40)])
+        self.assertEqual(service.process_batch(), 4)
+        service.close()
+
+        # One detector round per frame index, every camera with a frame left joins the round
+        self.assertEqual(self.tracker.calls, [["a", "b"], ["a"], ["a"]])
+        published = [(key, result["index"], result["pixel"], result["mac_address"])
+                     for _, key, result in self.producer.produced]
+        self.assertEqual(sorted(published), [("a", 0, 10, "a"), ("a", 1, 30, "a"), ("a", 2, 40, "a"),
+                                             ("b", 0, 20, "b")])
+        self.assertTrue(all(topic == "detections" for topic, _, _ in self.producer.produced))
+        self.assertEqual(service.stats, {"messages_consumed": 4, "frames_processed": 4, "decode_errors": 0,
+                                         "results_published": 4, "delivery_errors": 0})
+
+    def test_commit_after_publish(self):
+        service = self._service([_json_message("a", 10), _json_message("b", 20)])
+        service.process_batch()
+        service.close()
+        self.assertEqual(self.events, ["produce", "produce", "flush", "commit"])
+
+    def test_delivery_error_skips_commit(self):
+        service = self._service([_json_message("a", 10), _json_message("b", 20)], failed_keys={"b"})
+        with self.assertRaises(RuntimeError):
+            service.process_batch()
+        service.close()
+        self.assertEqual(self.consumer.commits, 0)
+        self.assertEqual(service.stats["delivery_errors"], 1)
+
+    def test_undelivered_results_skip_commit(self):
+        service = self._service([_json_message("a", 10)], undelivered=1)
+        with self.assertRaises(RuntimeError):
+            service.run()
+        service.close()
+        self.assertEqual(self.consumer.commits, 0)
+        self.assertEqual(self.events, ["produce", "flush"])
+
+    def test_decode_errors_are_counted_and_skipped(self):
+        service = self._service([_json_message("a", 10), FakeMessage(None), FakeMessage("not bytes"),
+                                 FakeMessage(b"{not json"), FakeMessage(b"VDTF truncated envelope......"),
+                                 FakeMessage(json.dumps({'mac_address': 'b', 'frame_data': 'AAAA'}).encode())])
+        self.assertEqual(service.process_batch(), 6)
+        service.close()
+        self.assertEqual(self.tracker.calls, [["a"]])
+        self.assertEqual(service.stats["decode_errors"], 5)
+        self.assertEqual(service.stats["frames_processed"], 1)
+        self.assertEqual(self.consumer.commits, 1)
+
+    def test_partition_eof_is_not_a_decode_error(self):
+        service = self._service([FakeMessage(None, error=FakeError(-191)), _json_message("a", 10)])
+        service.process_batch()
+        service.close()
+        self.assertEqual(service.stats["decode_errors"], 0)
+        self.assertEqual(service.stats["frames_processed"], 1)
+
+    def test_empty_batch_does_not_commit(self):
+        service = self._service([])
+        self.assertEqual(service.process_batch(), 0)
+        service.close()
+        self.assertEqual(self.events, [])
+
+    def test_run_consumes_batches(self):
+        service = self._service([_json_message("a", value) for value in range(5)], batch_size=2)
+        service.run(max_batches=3)
+        service.close()
+        self.assertEqual(self.consumer.commits, 3)
+        self.assertEqual([result["index"] for _, _, result in self.producer.produced], [0, 1, 2, 3, 4])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+from datetime import datetime, timedelta
+import numpy as np
+from VehicleDetectionTracker.VehicleDetectionTracker import VehicleDetectionTracker
+from VehicleDetectionTracker.classification_policy import ClassificationPolicy
+from VehicleDetectionTracker.classifier_core import BaseClassifier
+
+
+class StubTensor:
+    def __init__(self, values):
+        self.values = np.asarray(values)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.values
+
+    def int(self):
+        return StubTensor(self.values.astype(int))
+
+    def tolist(self):
+        return self.values.tolist()
+
+
+class StubBoxes:
+    def __init__(self, xywh, conf, ids, cls):
+        self.xywh = StubTensor(np.asarray(xywh, dtype=float))
+        self.conf = StubTensor(conf)
+        self.id = StubTensor(ids)
+        self.cls = StubTensor(np.asarray(cls, dtype=float))
+
+
+class StubResult:
+    names = {0: "car", 1: "truck"}
+
+    def __init__(self, xywh, conf, ids, cls):
+        self.boxes = StubBoxes(xywh, conf, ids, cls)
+
+
+class StubBackend:
+    def run(self, batch):
+        predictions = np.zeros((len(batch), 2), dtype=np.float32)
+        predictions[:, 0] = 0.9
+        predictions[:, 1] = 0.1
+        return predictions
+
+
+class StubClassifier(BaseClassifier):
+    classifier_input_size = (16, 16)
+
+    def __init__(self):
+        super().__init__(backend="tensorflow")
+        self.batches = 0
+
+    def initialize(self):
+        self.labels = ["white", "red"]
+        self.backend = StubBackend()
+
+    def predict_batch(self, crops):
+        self.batches += 1
+        return super().predict_batch(crops)
+
+    def format_class(self, label, prob):
+        return {"color": label, "prob": str(prob)}
+
+
+class AttributeCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.color_classifier = StubClassifier()
+        self.tracker = VehicleDetectionTracker(model=object(), color_classifier=self.color_classifier,
+                                               model_classifier=StubClassifier(),
+                                               classification_policy=ClassificationPolicy(min_area=400))
+        self.frame = np.zeros((240, 320, 3), dtype=np.uint8)
+        self.start = datetime(2024, 1, 1)
+
+    def _process(self, index, width):
+        result = StubResult([[100 + index, 100, width, width]], [0.9], [7], [1])
+        return self.tracker.process_tracking_result(self.frame, self.start + timedelta(seconds=index / 30), result,
+                                                    include_original=False, include_annotated=False,
+                                                    include_crops=False)
+
+    def test_ineligible_but_still_tracked_keeps_its_attributes(self):
+        self._process(0, 40)
+        self.assertEqual(self.color_classifier.batches, 1)
+        # The truck shrinks below min_area, it is no longer classified but ByteTrack still tracks it
+        for index in range(1, 100):
+            response = self._process(index, 10)
+        vehicle = response["detected_vehicles"][0]
+        self.assertIsNotNone(vehicle["color_info"])
+        self.assertEqual(self.color_classifier.batches, 1)
+        stats = self.tracker.get_state_stats()
+        self.assertEqual(stats["tracked_vehicles"], 1)
+        self.assertEqual(stats["cached_classifications"], 1)
+        self.assertEqual(stats["evicted_classifications"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()